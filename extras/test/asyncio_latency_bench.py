@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+# FILE: asyncio_latency_bench.py
+
+'''
+# End-to-end loop latency of GoPiGo3 calls from an asyncio event loop
+#
+# Each loop iteration reads both encoders and the battery voltage and sets the motor speed:
+#  run_in_executor          -- each call awaited with loop.run_in_executor on the default thread pool
+#  run_in_executor, gather  -- the three reads gathered, on the default thread pool
+#  AsyncGoPiGo3             -- each call awaited on the facade
+#  AsyncGoPiGo3, gather     -- the three reads gathered on the facade (one batch to the worker thread)
+#
+# The motors are commanded to 0 dps. Off-robot, run it against the simulator with GOPIGO3_SPI_BACKEND=sim.
+#
+#  Usage:  python3 asyncio_latency_bench.py [iterations]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import asyncio
+import sys
+import time
+
+import gopigo3
+import gopigo3_asyncio
+
+
+async def executor_sequential(gpg, loop):
+    await loop.run_in_executor(None, gpg.get_motor_encoder, gpg.MOTOR_LEFT)
+    await loop.run_in_executor(None, gpg.get_motor_encoder, gpg.MOTOR_RIGHT)
+    await loop.run_in_executor(None, gpg.get_voltage_battery)
+    await loop.run_in_executor(None, gpg.set_motor_dps, gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 0)
+
+
+async def executor_gather(gpg, loop):
+    await asyncio.gather(
+        loop.run_in_executor(None, gpg.get_motor_encoder, gpg.MOTOR_LEFT),
+        loop.run_in_executor(None, gpg.get_motor_encoder, gpg.MOTOR_RIGHT),
+        loop.run_in_executor(None, gpg.get_voltage_battery))
+    await loop.run_in_executor(None, gpg.set_motor_dps, gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 0)
+
+
+async def facade_sequential(agpg, loop):
+    await agpg.get_motor_encoder(agpg.MOTOR_LEFT)
+    await agpg.get_motor_encoder(agpg.MOTOR_RIGHT)
+    await agpg.get_voltage_battery()
+    await agpg.set_motor_dps(agpg.MOTOR_LEFT + agpg.MOTOR_RIGHT, 0)
+
+
+async def facade_gather(agpg, loop):
+    await asyncio.gather(
+        agpg.get_motor_encoder(agpg.MOTOR_LEFT),
+        agpg.get_motor_encoder(agpg.MOTOR_RIGHT),
+        agpg.get_voltage_battery())
+    await agpg.set_motor_dps(agpg.MOTOR_LEFT + agpg.MOTOR_RIGHT, 0)
+
+
+async def measure(body, target, iterations):
+    loop = asyncio.get_running_loop()
+    histogram = gopigo3.LatencyHistogram()
+    for _ in range(iterations // 10):
+        await body(target, loop)
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await body(target, loop)
+        histogram.record(time.perf_counter() - start)
+    return histogram.snapshot()
+
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    gpg = gopigo3.GoPiGo3()
+    agpg = gopigo3_asyncio.AsyncGoPiGo3(gpg)
+
+    tests = [
+        ("run_in_executor", executor_sequential, gpg),
+        ("run_in_executor, gather", executor_gather, gpg),
+        ("AsyncGoPiGo3", facade_sequential, agpg),
+        ("AsyncGoPiGo3, gather", facade_gather, agpg),
+    ]
+    print("%-26s %10s %10s %10s" % ("loop", "p50 us", "p99 us", "loops/s"))
+    for name, body, target in tests:
+        stats = await measure(body, target, iterations)
+        print("%-26s %10.1f %10.1f %10.0f" % (name, stats["p50"] * 1e6, stats["p99"] * 1e6, 1.0 / stats["mean"]))
+
+    agpg.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+# FILE: import_timing_bench.py
+
+'''
+# Timing benchmark of "import gopigo3" and the GoPiGo3() constructor
+#
+# Every run is a fresh Python process, like a short script or a restarted notebook kernel.
+#  cold -- the detection cache of the current boot is cleared first, so the constructor talks to the GoPiGo3
+#  warm -- the detection results of a previous process are reused
+# The second constructor in the same process also reuses the parsed gpg3_config.json.
+#
+# Run it on the robot. Off-robot it can run against the simulator (GOPIGO3_SPI_BACKEND=sim),
+# which doesn't use the detection cache.
+#
+#  Usage:  python3 import_timing_bench.py [runs]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import json
+import subprocess
+import sys
+
+CHILD = r'''
+import json, time
+t0 = time.perf_counter()
+import gopigo3
+t1 = time.perf_counter()
+gpg = gopigo3.GoPiGo3()
+t2 = time.perf_counter()
+gpg = gopigo3.GoPiGo3()
+t3 = time.perf_counter()
+print(json.dumps([t1 - t0, t2 - t1, t3 - t2]))
+'''
+
+CLEAR = "import gopigo3; gopigo3.clear_detection_cache()"
+
+
+def run(clear_cache):
+    if clear_cache:
+        subprocess.check_call([sys.executable, "-c", CLEAR], stdout = subprocess.DEVNULL)
+    output = subprocess.check_output([sys.executable, "-c", CHILD])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("%-6s %12s %16s %16s" % ("cache", "import ms", "1st GoPiGo3 ms", "2nd GoPiGo3 ms"))
+    for name, clear_cache in (("cold", True), ("warm", False)):
+        times = [run(clear_cache) for _ in range(runs)]
+        print("%-6s %12.2f %16.2f %16.2f" % (name,
+            median([t[0] for t in times]) * 1000, median([t[1] for t in times]) * 1000,
+            median([t[2] for t in times]) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# FILE: motion_profile_test.py
+
+'''
+# Compare a straight drive done with one set_motor_position jump against trapezoidal and S-curve motion profiles
+#
+# For each method the robot drives the distance forward and prints the time it took, the largest overshoot
+# past the target and the final error, in wheel degrees. Between runs the robot drives back with the same method.
+# Off-robot, run it against the simulator with GOPIGO3_SPI_BACKEND=sim.
+#
+#  Usage:  python3 motion_profile_test.py [distance_cm] [max_dps] [max_acceleration]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+
+import gopigo3
+import gopigo3_motion
+
+
+def jump(gpg, degrees, max_dps):
+    """ drive with a single position target, like drive_cm """
+    gpg.set_motor_limits(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, dps = max_dps)
+    start = gpg.get_motor_encoder(gpg.MOTOR_LEFT)
+    target = start + degrees
+    gpg.set_motor_position(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, target)
+    overshoot = 0
+    begin = time.monotonic()
+    settled_at = None
+    while time.monotonic() - begin < 10:
+        error = gpg.get_motor_encoder(gpg.MOTOR_LEFT) - target
+        overshoot = max(overshoot, error if degrees > 0 else -error)
+        if abs(error) <= 2:
+            if settled_at is None:
+                settled_at = time.monotonic()
+            elif time.monotonic() - settled_at > 0.2:
+                break
+        else:
+            settled_at = None
+        time.sleep(0.01)
+    gpg.set_motor_limits(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, dps = 0)
+    return settled_at - begin if settled_at else None, overshoot, gpg.get_motor_encoder(gpg.MOTOR_LEFT) - target
+
+
+def profiled(motion, degrees):
+    begin = time.monotonic()
+    motion.move_wheels(degrees, degrees)
+    elapsed = time.monotonic() - begin
+    errors = motion.get_tracking_error()
+    overshoot = max(0, max((s.left_actual - degrees) * (1 if degrees > 0 else -1) for s in motion.samples))
+    return elapsed, overshoot, errors["final_error_left"]
+
+
+def main():
+    distance = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+    max_dps = float(sys.argv[2]) if len(sys.argv) > 2 else 400.0
+    max_acceleration = float(sys.argv[3]) if len(sys.argv) > 3 else 800.0
+
+    gpg = gopigo3.GoPiGo3()
+    degrees = distance * 10.0 / gpg.WHEEL_CIRCUMFERENCE * 360.0
+    print("driving %.1f cm (%.0f wheel degrees) at up to %.0f dps" % (distance, degrees, max_dps))
+    print("%-22s %10s %14s %14s" % ("method", "time s", "overshoot deg", "final err deg"))
+
+    try:
+        result = jump(gpg, degrees, max_dps)
+        jump(gpg, -degrees, max_dps)
+        print("%-22s %10s %14.1f %14.1f" % ("set_motor_position", "%.2f" % result[0] if result[0] else "-",
+                                            result[1], result[2]))
+        for shape in (gopigo3_motion.PROFILE_TRAPEZOID, gopigo3_motion.PROFILE_S_CURVE):
+            motion = gopigo3_motion.MotionProfileExecutor(gpg, max_dps = max_dps, max_acceleration = max_acceleration,
+                                                          shape = shape)
+            result = profiled(motion, degrees)
+            motion.move_wheels(-degrees, -degrees)
+            print("%-22s %10.2f %14.1f %14.1f" % (shape, result[0], result[1], result[2]))
+    finally:
+        gpg.reset_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+# FILE: motor_batch_bench.py
+
+'''
+# Inter-wheel skew of separate vs batched motor commands
+#
+#  separate -- set_motor_dps(MOTOR_LEFT, ...) then set_motor_dps(MOTOR_RIGHT, ...), skew measured between the two calls
+#  batched  -- set_wheels_dps(left, right), skew as reported by the batch. On the robot the spidev backend sends the
+#              batch in one ioctl and the skew is modelled from the SPI clock and message_gap_us, not measured.
+#
+# The motors are commanded to turn slowly; put the robot on a stand.
+# Off-robot, run it against the simulator with GOPIGO3_SPI_BACKEND=sim.
+#
+#  Usage:  python3 motor_batch_bench.py [iterations]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+
+import gopigo3
+
+
+def print_histogram(name, histogram):
+    snapshot = histogram.snapshot()
+    print("%-10s p50=%8.1f us  p99=%8.1f us  max=%8.1f us" % (
+        name, snapshot["p50"] * 1e6, snapshot["p99"] * 1e6, snapshot["max"] * 1e6))
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    gpg = gopigo3.GoPiGo3()
+    separate = gopigo3.LatencyHistogram()
+    try:
+        for i in range(iterations):
+            left, right = 50 + i % 10, 60 + i % 10
+            start = time.perf_counter()
+            gpg.set_motor_dps(gpg.MOTOR_LEFT, left)
+            second = time.perf_counter()
+            gpg.set_motor_dps(gpg.MOTOR_RIGHT, right)
+            separate.record(second - start)
+
+        gpg.motor_batch_skew.reset()
+        for i in range(iterations):
+            gpg.set_wheels_dps(50 + i % 10, 60 + i % 10)
+    finally:
+        gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 0)
+
+    print("inter-wheel skew over %d commands (SPI clock %s Hz)" % (iterations, gpg.get_spi_speed()))
+    print_histogram("separate", separate)
+    print_histogram("batched", gpg.motor_batch_skew)
+    if isinstance(gpg.spi_backend, gopigo3.SpidevBackend):
+        print("(batched skew modelled from the SPI clock and a %d us message gap, not measured)" % gpg.spi_backend.message_gap_us)
+    else:
+        print("(batched skew measured with time.perf_counter())")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+# FILE: path_follow_test.py
+
+'''
+# Drive a square with a chain of stop-and-turn moves, then with the pure pursuit path follower
+#
+# Prints the time each method took and, for the follower, the lateral error from the path.
+# The robot needs room for a square of the given side (default 40 cm), starting at one corner and
+# turning left. Off-robot, run it against the simulator with GOPIGO3_SPI_BACKEND=sim.
+#
+#  Usage:  python3 path_follow_test.py [side_cm] [speed_mm_per_s]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+
+import gopigo3
+import gopigo3_motion
+import gopigo3_path
+
+
+def main():
+    side = float(sys.argv[1]) * 10.0 if len(sys.argv) > 1 else 400.0
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else 150.0
+
+    gpg = gopigo3.GoPiGo3()
+    try:
+        # stop at every corner: drive a side, turn in place, repeat
+        max_dps = speed / gpg.WHEEL_CIRCUMFERENCE * 360.0
+        motion = gopigo3_motion.MotionProfileExecutor(gpg, max_dps = max_dps, max_acceleration = 2 * max_dps)
+        start = time.monotonic()
+        for corner in range(3):
+            motion.drive_mm(side)
+            motion.turn_degrees(-90)
+        motion.drive_mm(side)
+        print("stop and turn:  %.2f s" % (time.monotonic() - start))
+        motion.turn_degrees(-90)
+
+        # the same square without stopping
+        follower = gopigo3_path.PurePursuitFollower(gpg, [(0, 0), (side, 0), (side, side), (0, side), (0, 0)],
+                                                    speed = speed)
+        start = time.monotonic()
+        follower.follow()
+        stats = follower.get_stats()
+        print("pure pursuit:   %.2f s, lateral error mean %.1f mm, rms %.1f mm, max %.1f mm" % (
+              time.monotonic() - start, stats["lateral_error_mean"], stats["lateral_error_rms"],
+              stats["lateral_error_max"]))
+    finally:
+        gpg.reset_all()
+
+
+if __name__ == "__main__":
+    main()
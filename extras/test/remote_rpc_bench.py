@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+# FILE: remote_rpc_bench.py
+
+'''
+# Time per call of a RemoteGoPiGo3: one round trip per call, pipelined calls and batched calls
+#
+# Each control loop iteration reads both encoders and the battery voltage and sets the motor speed.
+# Without an address, a GoPiGo3Server is started in this process on a loopback port (use GOPIGO3_SPI_BACKEND=sim
+# off-robot). With an address, the bench connects to a server already running on the robot:
+#     on the robot:         python3 -m gopigo3_remote --host 0.0.0.0
+#     on the workstation:   python3 remote_rpc_bench.py robot.local 8130
+#
+#  Usage:  python3 remote_rpc_bench.py [host port | unix_socket_path] [iterations]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+
+import gopigo3
+import gopigo3_remote
+
+
+def round_trips(gpg):
+    gpg.get_motor_encoder(gpg.MOTOR_LEFT)
+    gpg.get_motor_encoder(gpg.MOTOR_RIGHT)
+    gpg.get_voltage_battery()
+    gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 0)
+
+
+def pipelined(gpg):
+    futures = [gpg.call_async("get_motor_encoder", gpg.MOTOR_LEFT),
+               gpg.call_async("get_motor_encoder", gpg.MOTOR_RIGHT),
+               gpg.call_async("get_voltage_battery"),
+               gpg.call_async("set_motor_dps", gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 0)]
+    for future in futures:
+        future.result()
+
+
+def batched(gpg):
+    with gpg.batch() as batch:
+        futures = [batch.get_motor_encoder(gpg.MOTOR_LEFT),
+                   batch.get_motor_encoder(gpg.MOTOR_RIGHT),
+                   batch.get_voltage_battery(),
+                   batch.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 0)]
+    for future in futures:
+        future.result()
+
+
+def main():
+    args = sys.argv[1:]
+    iterations = 2000
+    server = None
+    if len(args) >= 2 and args[1].isdigit() and not args[0].isdigit():
+        address = (args[0], int(args[1]))
+        args = args[2:]
+    elif args and not args[0].isdigit():
+        address = args[0]
+        args = args[1:]
+    else:
+        server = gopigo3_remote.GoPiGo3Server(gopigo3.GoPiGo3(), ("127.0.0.1", 0))
+        server.start()
+        address = server.get_address()
+    if args:
+        iterations = int(args[0])
+
+    gpg = gopigo3_remote.RemoteGoPiGo3(address)
+    print("%-14s %12s %12s" % ("loop", "us/loop", "loops/s"))
+    for name, body in (("round trips", round_trips), ("pipelined", pipelined), ("batched", batched)):
+        for _ in range(iterations // 10):
+            body(gpg)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            body(gpg)
+        elapsed = (time.perf_counter() - start) / iterations
+        print("%-14s %12.1f %12.0f" % (name, elapsed * 1e6, 1.0 / elapsed))
+
+    gpg.close()
+    if server is not None:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
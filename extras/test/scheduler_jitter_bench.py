@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+# FILE: scheduler_jitter_bench.py
+
+'''
+# Loop rate and jitter of a time.sleep() loop vs the GoPiGo3Scheduler
+#
+# Both loops read the two motor encoders each cycle. The sleep loop is paced the way the test scripts do it,
+# time.sleep(period) after the loop body, so its rate drifts by the body duration.
+#
+# Off-robot, run it against the simulator with GOPIGO3_SPI_BACKEND=sim.
+#
+#  Usage:  python3 scheduler_jitter_bench.py [rate_hz] [seconds] [realtime_priority]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+
+import gopigo3
+import gopigo3_scheduler
+
+
+def main():
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 200.0
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    priority = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    period = 1.0 / rate
+
+    gpg = gopigo3.GoPiGo3()
+
+    def body():
+        gpg.get_motor_encoder(gpg.MOTOR_LEFT)
+        gpg.get_motor_encoder(gpg.MOTOR_RIGHT)
+
+    # time.sleep pacing
+    lateness = gopigo3.LatencyHistogram()
+    cycles = 0
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        lateness.record(max(0.0, (time.monotonic() - start) - cycles * period))
+        body()
+        cycles += 1
+        time.sleep(period)
+    sleep_rate = cycles / (time.monotonic() - start)
+
+    # scheduler pacing
+    scheduler = gopigo3_scheduler.GoPiGo3Scheduler(realtime_priority = priority)
+    task = scheduler.add(body, rate = rate, name = "encoders")
+    scheduler.start()
+    time.sleep(seconds)
+    scheduler.stop()
+    stats = task.get_stats()
+    scheduler_rate = stats["cycles"] / seconds
+
+    print("target %.0f Hz for %.1f s" % (rate, seconds))
+    print("%-12s %10s %16s" % ("pacing", "rate Hz", "drift after 1 s"))
+    print("%-12s %10.1f %14.1f ms" % ("time.sleep", sleep_rate, (1.0 - sleep_rate / rate) * 1000))
+    print("%-12s %10.1f %14.1f ms" % ("scheduler", scheduler_rate, (1.0 - scheduler_rate / rate) * 1000))
+    jitter = stats["jitter"]
+    print("\nscheduler jitter: p50 %.1f us, p99 %.1f us, max %.1f us; %d overruns, %d missed cycles" % (
+        jitter["p50"] * 1e6, jitter["p99"] * 1e6, jitter["max"] * 1e6, stats["overruns"], stats["missed_cycles"]))
+    if priority is not None:
+        print("real-time priority: %s" % ("not applied (%s)" % scheduler.realtime_error if scheduler.realtime_error else "applied"))
+
+
+if __name__ == "__main__":
+    main()
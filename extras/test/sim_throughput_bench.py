@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+# FILE: sim_throughput_bench.py
+
+'''
+# Hardware-free throughput benchmark of the GoPiGo3 driver against the firmware simulator
+#
+#  1. Calls per second of the common driver calls (driver + simulated firmware, no SPI wire time)
+#  2. A closed-loop "drive 1 meter" run in deterministic simulated time, reporting simulated vs wall time
+#
+#  Usage:  python3 sim_throughput_bench.py [seconds_per_test]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+
+import gopigo3
+import gopigo3_sim
+
+
+def calls_per_second(func, seconds):
+    calls = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for _ in range(100):
+            func()
+        calls += 100
+    return calls / seconds
+
+
+def drive_1m(gpg, sim, loop_period = 0.01):
+    """ Drive 1 m at 300 dps, checking the encoders every loop_period of simulated time """
+    gpg.reset_motor_encoder(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT)
+    target = 1000.0 / gpg.WHEEL_CIRCUMFERENCE * 360   # wheel degrees for 1 meter
+    start_sim = sim.now()
+    start_wall = time.perf_counter()
+    gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 300)
+    while gpg.get_motor_encoder(gpg.MOTOR_LEFT) < target:
+        sim.advance(loop_period)
+    gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 0)
+    return sim.now() - start_sim, time.perf_counter() - start_wall
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    sim = gopigo3_sim.GoPiGo3Simulator(time_scale = None)
+    gpg = gopigo3.GoPiGo3(spi_backend = sim, config_file_path = "/nonexistent/gpg3_config.json")
+    gpg.set_grove_mode(gpg.GROVE_1_1, gpg.GROVE_INPUT_ANALOG)
+
+    tests = [
+        ("get_motor_status",    lambda: gpg.get_motor_status(gpg.MOTOR_LEFT)),
+        ("get_motor_encoder",   lambda: gpg.get_motor_encoder(gpg.MOTOR_LEFT)),
+        ("get_voltage_battery", gpg.get_voltage_battery),
+        ("get_grove_analog",    lambda: gpg.get_grove_analog(gpg.GROVE_1_1)),
+        ("set_motor_dps",       lambda: gpg.set_motor_dps(gpg.MOTOR_LEFT, 100)),
+    ]
+    print("%-22s %14s" % ("call", "calls/s"))
+    for name, func in tests:
+        print("%-22s %14.0f" % (name, calls_per_second(func, seconds)))
+
+    sim_time, wall_time = drive_1m(gpg, sim)
+    print("\ndrive 1 m at 300 dps: %.2f s simulated in %.3f s wall time (%.0fx real time)" % (sim_time, wall_time, sim_time / wall_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+# FILE: spi_fastpath_bench.py
+
+'''
+# Micro-benchmark of the GoPiGo3 SPI read path
+#
+# Compares calls per second of the preallocated-buffer / struct decoding read path in gopigo3.py
+# against the previous list-building path, using a fake spidev so only the Python overhead is measured.
+# Runs off-robot; on a robot the real SPI device is replaced by the fake for the duration of the run.
+#
+#  Usage:  python3 spi_fastpath_bench.py [seconds_per_test]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+
+import gopigo3
+
+
+class FakeSpiDev(gopigo3.SPIBackend):
+    """
+    Answers every transfer like the GoPiGo3 firmware would, with 0xA5 at byte 3.
+
+    xfer2 returns a new list like spidev does. xfer_into copies the reply into the preallocated
+    buffer like the SPI_IOC_MESSAGE ioctl used by gopigo3.SpidevBackend does.
+    """
+
+    def __init__(self):
+        self.payload = [0x00, 0x00, 0x00, 0xA5, 0x00, 0xFE, 0xFF, 0xFF, 0xFC, 0x18, 0xFF, 0x38]
+        self.replies = {}
+        for n in range(1, 64):
+            self.replies[n] = bytes((self.payload + [0] * n)[:n])
+
+    def xfer2(self, data_out):
+        n = len(data_out)
+        reply = self.payload[:n]
+        if n > len(reply):
+            reply.extend([0] * (n - len(reply)))
+        return reply
+
+    def xfer_into(self, message):
+        message.rx[:] = self.replies[len(message.rx)]
+
+
+class LegacyGoPiGo3(gopigo3.GoPiGo3):
+    """ The read path as it was before the struct decoders: a new list per request, decoded with shifts """
+
+    def spi_read_32(self, MessageType):
+        outArray = [self.SPI_Address, MessageType, 0, 0, 0, 0, 0, 0]
+        reply = self.spi_transfer_array(outArray)
+        if(reply[3] == 0xA5):
+            return int((reply[4] << 24) | (reply[5] << 16) | (reply[6] << 8) | reply[7])
+        raise IOError("No SPI response")
+
+    def spi_read_16(self, MessageType):
+        outArray = [self.SPI_Address, MessageType, 0, 0, 0, 0]
+        reply = self.spi_transfer_array(outArray)
+        if(reply[3] == 0xA5):
+            return int((reply[4] << 8) | reply[5])
+        raise IOError("No SPI response")
+
+    def get_motor_status(self, port):
+        if port == self.MOTOR_LEFT:
+            message_type = self.SPI_MESSAGE_TYPE.GET_MOTOR_STATUS_LEFT
+        else:
+            message_type = self.SPI_MESSAGE_TYPE.GET_MOTOR_STATUS_RIGHT
+        outArray = [self.SPI_Address, message_type, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        reply = self.spi_transfer_array(outArray)
+        if(reply[3] == 0xA5):
+            power = int(reply[5])
+            if power & 0x80:
+                power = power - 0x100
+            encoder = int((reply[6] << 24) | (reply[7] << 16) | (reply[8] << 8) | reply[9])
+            if encoder & 0x80000000:
+                encoder = int(encoder - 0x100000000)
+            dps = int((reply[10] << 8) | reply[11])
+            if dps & 0x8000:
+                dps = dps - 0x10000
+            return [reply[4], power, int(encoder / self.MOTOR_TICKS_PER_DEGREE), int(dps / self.MOTOR_TICKS_PER_DEGREE)]
+        raise IOError("No SPI response")
+
+    def get_motor_encoder(self, port):
+        if port == self.MOTOR_LEFT:
+            message_type = self.SPI_MESSAGE_TYPE.GET_MOTOR_ENCODER_LEFT
+        else:
+            message_type = self.SPI_MESSAGE_TYPE.GET_MOTOR_ENCODER_RIGHT
+        encoder = self.spi_read_32(message_type)
+        if encoder & 0x80000000:
+            encoder = int(encoder - 0x100000000)
+        return int(encoder / self.MOTOR_TICKS_PER_DEGREE)
+
+
+def calls_per_second(func, seconds):
+    calls = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for _ in range(1000):
+            func()
+        calls += 1000
+    return calls / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    gopigo3.set_spi_backend(FakeSpiDev())
+
+    fast = gopigo3.GoPiGo3(detect = False, config_file_path = "/nonexistent/gpg3_config.json")
+    legacy = LegacyGoPiGo3(detect = False, config_file_path = "/nonexistent/gpg3_config.json")
+    assert fast.get_motor_status(fast.MOTOR_LEFT) == legacy.get_motor_status(legacy.MOTOR_LEFT)
+    assert fast.get_motor_encoder(fast.MOTOR_LEFT) == legacy.get_motor_encoder(legacy.MOTOR_LEFT)
+
+    tests = [
+        ("get_motor_status",    lambda gpg: (lambda: gpg.get_motor_status(gpg.MOTOR_LEFT))),
+        ("get_motor_encoder",   lambda gpg: (lambda: gpg.get_motor_encoder(gpg.MOTOR_LEFT))),
+        ("get_voltage_battery", lambda gpg: gpg.get_voltage_battery),
+    ]
+
+    print("%-22s %14s %14s %8s" % ("call", "legacy/s", "fast/s", "speedup"))
+    for name, make in tests:
+        legacy_rate = calls_per_second(make(legacy), seconds)
+        fast_rate = calls_per_second(make(fast), seconds)
+        print("%-22s %14.0f %14.0f %7.2fx" % (name, legacy_rate, fast_rate, fast_rate / legacy_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# FILE: spi_lock_bench.py
+
+'''
+# Benchmark and check of the GoPiGo3 SPI transaction lock
+#
+#  1. Cost of an uncontended acquire/release, thread-only and cross-process (flock on a lock file)
+#  2. Mutual exclusion between processes: several processes increment a counter file under the lock
+#  3. Wait and hold time histograms with several threads sharing one GoPiGo3 (simulator backend)
+#
+#  Runs off-robot; the lock file used here is a temporary file, not the one used by the driver.
+#
+#  Usage:  python3 spi_lock_bench.py [processes] [increments_per_process]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import gopigo3
+import gopigo3_sim
+
+
+def acquire_release_ns(lock, n = 100000):
+    start = time.perf_counter()
+    for _ in range(n):
+        lock.acquire()
+        lock.release()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def increment_counter(lock_path, counter_path, increments):
+    lock = gopigo3.SPITransactionLock(lock_path)
+    for _ in range(increments):
+        with lock:
+            with open(counter_path, "r+") as f:
+                value = int(f.read() or 0)
+                f.seek(0)
+                f.write(str(value + 1))
+                f.truncate()
+    stats = lock.get_stats()
+    return stats["process_contentions"]
+
+
+def print_histogram(name, histogram):
+    if not histogram["count"]:
+        print("%-10s empty" % name)
+        return
+    print("%-10s n=%-8d p50=%8.1f us  p99=%8.1f us  p99.9=%8.1f us  max=%8.1f us" % (
+        name, histogram["count"], histogram["p50"] * 1e6, histogram["p99"] * 1e6,
+        histogram["p999"] * 1e6, histogram["max"] * 1e6))
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    increments = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    directory = tempfile.mkdtemp()
+    lock_path = os.path.join(directory, "spi.lock")
+    counter_path = os.path.join(directory, "counter")
+    with open(counter_path, "w") as f:
+        f.write("0")
+
+    print("uncontended acquire + release")
+    print("  thread-only lock:    %6.0f ns" % acquire_release_ns(gopigo3.SPITransactionLock()))
+    print("  cross-process lock:  %6.0f ns" % acquire_release_ns(gopigo3.SPITransactionLock(lock_path)))
+
+    pool = multiprocessing.Pool(processes)
+    start = time.perf_counter()
+    contentions = pool.starmap(increment_counter, [(lock_path, counter_path, increments)] * processes)
+    elapsed = time.perf_counter() - start
+    pool.close()
+    pool.join()
+    with open(counter_path) as f:
+        total = int(f.read())
+    print("\n%d processes x %d locked increments: counter = %d (expected %d) %s, %d process contentions, %.2f s" % (
+        processes, increments, total, processes * increments,
+        "OK" if total == processes * increments else "FAILED", sum(contentions), elapsed))
+
+    sim = gopigo3_sim.GoPiGo3Simulator()
+    sim.transaction_lock = gopigo3.SPITransactionLock(lock_path)
+    gpg = gopigo3.GoPiGo3(spi_backend = sim, config_file_path = "/nonexistent/gpg3_config.json")
+    gpg.spi_lock.reset_stats()
+
+    def worker():
+        for _ in range(2000):
+            gpg.get_motor_encoder(gpg.MOTOR_LEFT)
+
+    threads = [threading.Thread(target = worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = gpg.spi_lock.get_stats()
+    print("\n4 threads sharing one GoPiGo3: %d acquisitions, %d thread contentions" % (
+        stats["acquisitions"], stats["thread_contentions"]))
+    print_histogram("wait", stats["wait_time"])
+    print_histogram("hold", stats["hold_time"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+# FILE: spi_speed_bench.py
+
+'''
+# On-robot benchmark of the GoPiGo3 SPI clock
+#
+# For every SPI clock, measures get_motor_status calls per second and counts bad replies
+# (missing 0xA5 marker). With --self-test, runs GoPiGo3.spi_self_test afterwards, which selects
+# the fastest reliable clock and saves it so that future imports of gopigo3 use it.
+#
+# Stop any other program using the GoPiGo3 first; the SPI lock is held for each step.
+# Off-robot, run it against the simulator with GOPIGO3_SPI_BACKEND=sim.
+#
+#  Usage:  python3 spi_speed_bench.py [seconds_per_speed] [--self-test]
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+
+import gopigo3
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    seconds = float(args[0]) if args else 1.0
+
+    gpg = gopigo3.GoPiGo3()
+    original = gpg.get_spi_speed()
+    print("current SPI clock: %s Hz\n" % original)
+
+    print("%12s %14s %10s %14s" % ("clock Hz", "calls/s", "errors", "us/call"))
+    try:
+        for speed_hz in gopigo3.SPI_SELF_TEST_SPEEDS:
+            calls = 0
+            errors = 0
+            with gpg.spi_lock:
+                gpg.set_spi_speed(speed_hz)
+                start = time.perf_counter()
+                end = start + seconds
+                while time.perf_counter() < end:
+                    for _ in range(100):
+                        try:
+                            gpg.get_motor_status(gpg.MOTOR_LEFT)
+                        except IOError:
+                            errors += 1
+                    calls += 100
+                elapsed = time.perf_counter() - start
+            print("%12d %14.0f %10d %14.1f" % (speed_hz, calls / elapsed, errors, elapsed / calls * 1e6))
+    finally:
+        gpg.set_spi_speed(original)
+
+    if "--self-test" in sys.argv:
+        result = gpg.spi_self_test()
+        if result["save_error"] is None:
+            print("\nself test selected %d Hz (saved to %s)" % (result["speed_hz"], gopigo3.SPI_SPEED_FILE_PATH))
+        else:
+            print("\nself test selected %d Hz (not saved: %s)" % (result["speed_hz"], result["save_error"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+# FILE: spi_trace_report.py
+
+'''
+# SPI transfer latency per message type from a GoPiGo3 SPI trace
+#
+# Record a trace of any GoPiGo3 program by setting GOPIGO3_SPI_TRACE, then print the latency percentiles.
+# Each process writes to the given path followed by its pid:
+#
+#  Usage:  GOPIGO3_SPI_TRACE=/tmp/run.gpg3trace python3 my_program.py
+#          python3 spi_trace_report.py /tmp/run.gpg3trace.<pid>
+'''
+
+from __future__ import print_function
+from __future__ import division
+
+import sys
+
+import gopigo3_trace
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 spi_trace_report.py TRACE_FILE")
+        sys.exit(1)
+
+    records = gopigo3_trace.read_trace(sys.argv[1])
+    if records:
+        span = (records[-1].timestamp_ns - records[0].timestamp_ns) / 1e9
+        print("%d transfers in %.3f s" % (len(records), span))
+    report = gopigo3_trace.latency_report(records)
+    print("%-28s %8s %8s %9s %9s %9s %9s" % ("message type", "count", "errors", "p50 us", "p90 us", "p99 us", "max us"))
+    for name, stats in sorted(report.items(), key = lambda item: -item[1]["count"]):
+        print("%-28s %8d %8d %9.1f %9.1f %9.1f %9.1f" % (name, stats["count"], stats["errors"],
+              stats["p50"] * 1e6, stats["p90"] * 1e6, stats["p99"] * 1e6, stats["max"] * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# asyncio interface for the GoPiGo3
+
+from __future__ import print_function
+from __future__ import division
+
+import asyncio
+import concurrent.futures
+
+import gopigo3
+
+
+# GoPiGo3 methods with an awaitable version on AsyncGoPiGo3. Other methods are wrapped on first use.
+ASYNC_METHODS = [
+    # motors
+    "set_motor_power", "set_motor_position", "set_motor_dps", "set_motor_limits",
+    "set_wheels_power", "set_wheels_position", "set_wheels_dps", "set_wheels_limits",
+    "get_motor_status", "get_motor_encoder", "get_motor_encoder_ticks",
+    "offset_motor_encoder", "reset_motor_encoder",
+    # grove
+    "set_grove_type", "set_grove_mode", "set_grove_state", "set_grove_pwm_duty", "set_grove_pwm_frequency",
+    "get_grove_value", "get_grove_state", "get_grove_voltage", "get_grove_analog",
+    "grove_i2c_transfer", "grove_i2c_start",
+    # LEDs, servos, voltages
+    "set_led", "set_servo", "get_voltage_battery", "get_voltage_5v",
+    "reset_all",
+]
+
+
+class AsyncGoPiGo3(object):
+    """
+    Awaitable versions of the GoPiGo3 methods, for asyncio programs.
+
+    Every call runs on one worker thread, so SPI access stays serialized and the event loop never blocks on
+    SPI. Calls made in the same event loop iteration -- for example with ``asyncio.gather`` -- go to the worker
+    as one batch and their results come back with one event loop wake-up, instead of a thread hand-off per call.
+
+    .. code-block:: python
+
+        async def main():
+            gpg = AsyncGoPiGo3()
+            await gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 200)
+            left, right, battery = await asyncio.gather(
+                gpg.get_motor_encoder(gpg.MOTOR_LEFT),
+                gpg.get_motor_encoder(gpg.MOTOR_RIGHT),
+                gpg.get_voltage_battery())
+
+    Constants (``MOTOR_LEFT``, ``GROVE_1``, ...) and other attributes are read from the wrapped GoPiGo3 object.
+    """
+
+    def __init__(self, gpg = None, **kwargs):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object to wrap. By default a new one is created with the other keyword arguments.
+        """
+        if gpg is None:
+            gpg = gopigo3.GoPiGo3(**kwargs)
+        self.gpg = gpg
+        self.batches = 0
+        self.calls = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "AsyncGoPiGo3")
+        self._pending = {}      # event loop -> calls not yet handed to the worker
+
+    def __getattr__(self, name):
+        if name == "gpg":
+            # not set yet (the constructor failed): don't recurse looking it up
+            raise AttributeError(name)
+        value = getattr(self.gpg, name)
+        if not callable(value):
+            return value
+        # cached on this object, so later accesses don't come back here. The GoPiGo3 method is looked up on every
+        # call, like for ASYNC_METHODS, in case it gets replaced (enable_instrumentation).
+        gpg = self.gpg
+        def method(*args, **kwargs):
+            return self.run(getattr(gpg, name), *args, **kwargs)
+        method.__name__ = name
+        setattr(self, name, method)
+        return method
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run any function on the worker thread, serialized with the GoPiGo3 calls.
+
+        Returns an asyncio future for the result of ``func(*args, **kwargs)``.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.get(loop)
+        if pending is None:
+            pending = self._pending[loop] = []
+            loop.call_soon(self._flush, loop)
+        pending.append((func, args, kwargs, future))
+        return future
+
+    def _flush(self, loop):
+        batch = self._pending.pop(loop, None)
+        if batch:
+            self.batches += 1
+            self.calls += len(batch)
+            try:
+                self._executor.submit(self._run_batch, loop, batch)
+            except RuntimeError as e:
+                # close() was called in the meantime
+                for _, _, _, future in batch:
+                    if not future.cancelled():
+                        future.set_exception(e)
+
+    @staticmethod
+    def _run_batch(loop, batch):
+        results = []
+        for func, args, kwargs, future in batch:
+            if future.cancelled():
+                continue
+            try:
+                results.append((future, func(*args, **kwargs), None))
+            except Exception as e:
+                results.append((future, None, e))
+        try:
+            loop.call_soon_threadsafe(AsyncGoPiGo3._resolve, results)
+        except RuntimeError:
+            # the event loop was closed in the meantime
+            pass
+
+    @staticmethod
+    def _resolve(results):
+        for future, result, error in results:
+            if future.cancelled():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """
+        Finish the calls already handed to the worker and stop it
+        """
+        self._executor.shutdown(wait = True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
+
+
+def _async_method(name):
+    def method(self, *args, **kwargs):
+        return self.run(getattr(self.gpg, name), *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = "Awaitable version of :py:meth:`gopigo3.GoPiGo3.%s`" % name
+    return method
+
+for _name in ASYNC_METHODS:
+    setattr(AsyncGoPiGo3, _name, _async_method(_name))
@@ -0,0 +1,242 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Battery monitoring for the GoPiGo3
+
+from __future__ import print_function
+from __future__ import division
+
+import collections
+import threading
+import time
+
+from gopigo3_scheduler import PeriodicTask, run_periodic
+
+
+BatteryStatus = collections.namedtuple("BatteryStatus", [
+    "timestamp",        # time.monotonic() of the latest sample
+    "voltage",          # filtered battery voltage in volts
+    "raw_voltage",      # the latest get_voltage_battery reading in volts
+    "loaded",           # True if a motor was powered during the latest sample
+    "slope",            # discharge rate in volts per second (negative while discharging), or None
+    "runtime",          # estimated seconds until the voltage reaches cutoff_voltage, or None if unknown
+    "speed_scale",      # 1.0 with a good battery, down to min_speed_scale at cutoff_voltage
+    "low_voltage_float",    # True if the GoPiGo3 floated the motors because the voltage was too low
+])
+
+
+class BatteryMonitor(object):
+    """
+    Sample the GoPiGo3 battery voltage at a low rate on a background thread, filter it and predict the runtime left.
+
+    Each reading goes through a median filter (against spikes from motor current) and an exponentially weighted
+    moving average. Since the voltage sags under load, both filters start over whenever the motors are powered or
+    unpowered, and the discharge slope is a least squares fit over the last ``slope_window`` seconds of filtered
+    voltages taken under the same load as the latest sample. Readers get the cached :py:class:`BatteryStatus`
+    without any SPI transactions.
+
+    Control loops can slow down before the battery browns out with :py:meth:`get_speed_scale` or
+    :py:meth:`limit_dps`, or let the monitor set the motor speed limit itself with ``auto_limit_dps``:
+
+    .. code-block:: python
+
+        battery = BatteryMonitor(gpg, auto_limit_dps = 600)
+        battery.start()
+        ...
+        status = battery.get_status()
+        print("%.2f V, %s s left" % (status.voltage, status.runtime))
+
+    """
+
+    def __init__(self, gpg, rate = 2, median_window = 5, ewma_alpha = 0.2, slope_window = 120.0,
+                 warn_voltage = 8.0, cutoff_voltage = 7.0, min_speed_scale = 0.3, auto_limit_dps = None):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object
+        rate -- samples per second
+        median_window -- the number of readings in the median filter. 1 disables it.
+        ewma_alpha -- the weight of each new median in the moving average, from 0 to 1. 1 disables it.
+        slope_window -- how many seconds of history the discharge slope is fitted over
+        warn_voltage -- below this voltage the speed scale starts going down
+        cutoff_voltage -- the voltage at which the battery is considered empty, above the GoPiGo3 low voltage cutoff
+        min_speed_scale -- the speed scale at cutoff_voltage and below
+        auto_limit_dps -- if not None, keep the motor speed limit (set_motor_limits) at this many dps times the
+                          speed scale
+        """
+        if rate <= 0:
+            raise ValueError("rate must be a positive number")
+        if warn_voltage <= cutoff_voltage:
+            raise ValueError("warn_voltage must be above cutoff_voltage")
+        self.gpg = gpg
+        self.period = 1.0 / rate
+        self.median_window = max(1, int(median_window))
+        self.ewma_alpha = ewma_alpha
+        self.slope_window = slope_window
+        self.warn_voltage = warn_voltage
+        self.cutoff_voltage = cutoff_voltage
+        self.min_speed_scale = min_speed_scale
+        self.auto_limit_dps = auto_limit_dps
+
+        self.samples = 0
+        self.errors = 0
+        self.last_error = None
+        self.applied_limit_dps = None
+
+        self._readings = collections.deque(maxlen = self.median_window)
+        self._filtered = None
+        self._loaded = None     # the load the filters were fed under
+        self._history = collections.deque()     # (timestamp, filtered voltage, loaded)
+        self._status = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start sampling on a background thread. The first sample is taken before returning.
+        """
+        if self.is_running():
+            return
+        if self._status is None:
+            self.update()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target = self._run, name = "BatteryMonitor")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout = 1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_status(self):
+        """
+        Get the latest BatteryStatus, or None before the first sample. Never blocks and never touches SPI.
+        """
+        return self._status
+
+    def get_voltage(self):
+        """
+        Get the filtered battery voltage in volts, or None before the first sample
+        """
+        status = self._status
+        return status.voltage if status is not None else None
+
+    def get_runtime(self):
+        """
+        Get the estimated seconds left until cutoff_voltage, or None if the voltage isn't going down yet
+        """
+        status = self._status
+        return status.runtime if status is not None else None
+
+    def get_speed_scale(self):
+        """
+        Get the factor (min_speed_scale to 1.0) to scale speeds by for the current battery voltage
+        """
+        status = self._status
+        return status.speed_scale if status is not None else 1.0
+
+    def limit_dps(self, dps):
+        """
+        Scale a speed in degrees per second by the speed scale
+        """
+        return dps * self.get_speed_scale()
+
+    def update(self):
+        """
+        Sample the battery on the calling thread. Returns the new BatteryStatus.
+        """
+        gpg = self.gpg
+        with gpg.spi_lock:
+            raw = gpg.get_voltage_battery()
+            status_left = gpg.get_motor_status(gpg.MOTOR_LEFT)
+            status_right = gpg.get_motor_status(gpg.MOTOR_RIGHT)
+        now = time.monotonic()
+        loaded = any(status[1] not in (0, gpg.MOTOR_FLOAT) for status in (status_left, status_right))
+        low_voltage_float = bool((status_left[0] | status_right[0]) & 0x01)
+
+        if loaded != self._loaded:
+            # don't average across the step the load makes in the voltage
+            self._readings.clear()
+            self._filtered = None
+            self._loaded = loaded
+        self._readings.append(raw)
+        median = sorted(self._readings)[len(self._readings) // 2]
+        if self._filtered is None:
+            self._filtered = median
+        else:
+            self._filtered += self.ewma_alpha * (median - self._filtered)
+        voltage = self._filtered
+
+        history = self._history
+        history.append((now, voltage, loaded))
+        while history and history[0][0] < now - self.slope_window:
+            history.popleft()
+
+        slope = self._fit_slope(loaded)
+        runtime = None
+        if voltage <= self.cutoff_voltage:
+            runtime = 0.0
+        elif slope is not None and slope < 0:
+            runtime = (voltage - self.cutoff_voltage) / -slope
+
+        if voltage >= self.warn_voltage:
+            speed_scale = 1.0
+        elif voltage <= self.cutoff_voltage:
+            speed_scale = self.min_speed_scale
+        else:
+            f = (voltage - self.cutoff_voltage) / (self.warn_voltage - self.cutoff_voltage)
+            speed_scale = self.min_speed_scale + (1.0 - self.min_speed_scale) * f
+
+        status = BatteryStatus(now, voltage, raw, loaded, slope, runtime, speed_scale, low_voltage_float)
+        self._status = status
+        self.samples += 1
+        if self.auto_limit_dps is not None:
+            self._apply_limit(speed_scale)
+        return status
+
+    def _fit_slope(self, loaded):
+        # least squares line through the samples taken under the same load condition as the latest one
+        points = [(t, v) for t, v, l in self._history if l == loaded]
+        if len(points) < 3:
+            return None
+        n = len(points)
+        t0 = points[0][0]
+        mean_t = sum(t - t0 for t, _ in points) / n
+        mean_v = sum(v for _, v in points) / n
+        variance = sum((t - t0 - mean_t) ** 2 for t, _ in points)
+        if variance <= 0:
+            return None
+        return sum((t - t0 - mean_t) * (v - mean_v) for t, v in points) / variance
+
+    def _apply_limit(self, speed_scale):
+        limit = int(self.auto_limit_dps * speed_scale)
+        # only touch the limit when it changed noticeably, not on every sample
+        if self.applied_limit_dps is None or abs(limit - self.applied_limit_dps) >= 0.05 * self.auto_limit_dps:
+            self.gpg.set_motor_limits(self.gpg.MOTOR_LEFT + self.gpg.MOTOR_RIGHT, dps = limit)
+            self.applied_limit_dps = limit
+
+    def _sample(self):
+        try:
+            self.update()
+        except Exception as e:
+            # IOError from the SPI bus, or anything else: keep the previous status and try again next cycle
+            self.errors += 1
+            self.last_error = e
+
+    def _run(self):
+        # the first sample was taken by start()
+        run_periodic(PeriodicTask(self._sample, self.period, "BatteryMonitor"), self._stop_event,
+                     first = time.monotonic() + self.period)
@@ -0,0 +1,512 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Shared memory telemetry broker, so several processes can share one GoPiGo3
+
+from __future__ import print_function
+from __future__ import division
+
+import collections
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from multiprocessing import shared_memory
+
+import gopigo3
+from gopigo3_remote import encode, decode
+from gopigo3_scheduler import PeriodicTask, run_periodic
+from gopigo3_telemetry import TelemetrySnapshot
+
+
+DEFAULT_SEGMENT_NAME = "gopigo3_telemetry"
+COMMAND_SOCKET_NAME = "gopigo3_broker.sock"
+
+# GoPiGo3 methods clients can send to the broker. They're fire and forget: errors are only counted.
+COMMAND_METHODS = [
+    "set_motor_power", "set_motor_position", "set_motor_dps", "set_motor_limits",
+    "set_wheels_power", "set_wheels_position", "set_wheels_dps", "set_wheels_limits",
+    "offset_motor_encoder", "reset_motor_encoder",
+    "set_led", "set_servo",
+    "set_grove_type", "set_grove_mode", "set_grove_state", "set_grove_pwm_duty", "set_grove_pwm_frequency",
+    "reset_all",
+]
+
+GROVE_ANALOG_PINS = [gopigo3.GoPiGo3.GROVE_1_1, gopigo3.GoPiGo3.GROVE_1_2,
+                     gopigo3.GoPiGo3.GROVE_2_1, gopigo3.GoPiGo3.GROVE_2_2]
+GROVE_VALUE_PORTS = [gopigo3.GoPiGo3.GROVE_1, gopigo3.GoPiGo3.GROVE_2]
+
+# Segment layout: the header, then the telemetry record protected by the seqlock counter in the header.
+#   header: magic, layout version, reserved, seqlock counter (odd while the broker writes), broker pid,
+#           commands executed, commands that failed
+#   record: timestamp, sequence, left and right motor status (flags, power, encoder, dps), battery and 5v voltages,
+#           grove analog readings (GROVE_ANALOG_PINS), grove values (GROVE_VALUE_PORTS), valid grove readings
+#           (a bit per pin, then per port), CRC-32 of the record before it
+SEGMENT_MAGIC = b"GPGB"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct("<4sHHIIII")
+SEQUENCE_OFFSET = 8
+RECORD = struct.Struct("<dQ4i4idd4i2iI")
+CRC = struct.Struct("<I")
+RECORD_OFFSET = SEGMENT_HEADER.size
+SEGMENT_SIZE = RECORD_OFFSET + RECORD.size + CRC.size
+
+
+BrokerSnapshot = collections.namedtuple("BrokerSnapshot", TelemetrySnapshot._fields + (
+    "grove_analog",     # dict of grove pin to raw analog reading, for the pins the broker samples
+    "grove_value",      # dict of grove port to get_grove_value, for the ports the broker samples
+))
+
+
+def command_socket_path():
+    """
+    Get the path of the broker's command socket
+    """
+    return gopigo3.runtime_file_path(COMMAND_SOCKET_NAME)
+
+
+_created_segments = set()    # segments created by a broker in this process
+
+
+def _attach(name):
+    # Attach to an existing segment without registering it with this process' resource tracker, which would
+    # otherwise remove the broker's segment when this process exits.
+    try:
+        return shared_memory.SharedMemory(name, track = False)
+    except TypeError:
+        # before Python 3.13
+        segment = shared_memory.SharedMemory(name)
+        if name in _created_segments:
+            # already registered by the broker, which unlinks it
+            return segment
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(segment._name, "shared_memory")
+        except Exception:
+            pass
+        return segment
+
+
+def _segment_owner(name):
+    # the pid of the live broker that created an existing segment, or None if that broker is gone
+    segment = _attach(name)
+    try:
+        magic, _, _, _, pid, _, _ = SEGMENT_HEADER.unpack_from(segment.buf, 0)
+    finally:
+        segment.close()
+    if magic != SEGMENT_MAGIC or pid <= 0:
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        # running as another user
+        pass
+    return pid
+
+
+class GoPiGo3Broker(object):
+    """
+    The one process that talks to the GoPiGo3: it polls the telemetry into a shared memory segment and executes
+    the motor (and LED, servo, grove) commands that clients send.
+
+    The telemetry record in the segment is written under a seqlock: the broker makes the counter odd, writes the
+    record and makes it even again, and readers retry when the counter was odd or changed while they copied the
+    record. Python can't issue memory barriers, so the record also carries a CRC-32 that readers check, which
+    catches a torn read even on CPUs that reorder the stores.
+
+    Commands arrive as datagrams on a Unix socket, so any process of the broker's user can send them without a
+    connection and without waiting for the broker. Only one broker can own a segment name at a time.
+
+    .. code-block:: python
+
+        # in a service or a terminal on the robot
+        broker = GoPiGo3Broker(rate = 100, grove_analog_pins = [gopigo3.GoPiGo3.GROVE_1_1])
+        broker.serve_forever()
+
+    The broker can also be started from the command line: ``python3 -m gopigo3_broker``. Clients use
+    :py:class:`BrokerClient`.
+    """
+
+    def __init__(self, gpg = None, rate = 100, grove_analog_pins = (), grove_value_ports = (),
+                 segment_name = DEFAULT_SEGMENT_NAME, command_path = None):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object, by default a new one
+        rate -- telemetry updates per second
+        grove_analog_pins -- grove pins to read with get_grove_analog. They're set to GROVE_INPUT_ANALOG on start.
+        grove_value_ports -- grove ports to read with get_grove_value (for example an ultrasonic sensor). Their
+                             type must be set with set_grove_type, by the broker's owner or with a client command.
+        segment_name -- the name of the shared memory segment
+        command_path -- the path of the command socket, by default :py:func:`command_socket_path`
+        """
+        if rate <= 0:
+            raise ValueError("rate must be a positive number")
+        self.gpg = gpg if gpg is not None else gopigo3.GoPiGo3()
+        self.period = 1.0 / rate
+        self.grove_analog_pins = [pin for pin in GROVE_ANALOG_PINS if pin in grove_analog_pins]
+        self.grove_value_ports = [port for port in GROVE_VALUE_PORTS if port in grove_value_ports]
+        self.segment_name = segment_name
+        self.command_path = command_path if command_path is not None else command_socket_path()
+
+        self.cycles = 0
+        self.errors = 0
+        self.commands = 0
+        self.command_errors = 0
+        self.last_error = None
+        self.last_command_error = None
+
+        self._segment = None
+        self._socket = None
+        self._poll_task = None
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    @property
+    def overruns(self):
+        """
+        The number of poll cycles that ended after the next one was due
+        """
+        task = self._poll_task
+        return task.overruns if task is not None else 0
+
+    def open(self):
+        """
+        Create the shared memory segment and the command socket
+        """
+        if self._segment is not None:
+            return
+        try:
+            self._segment = shared_memory.SharedMemory(self.segment_name, create = True, size = SEGMENT_SIZE)
+        except FileExistsError:
+            pid = _segment_owner(self.segment_name)
+            if pid is not None:
+                raise IOError("a GoPiGo3 broker is already running (pid %d)" % pid)
+            # left over by a broker that didn't exit cleanly
+            stale = shared_memory.SharedMemory(self.segment_name)
+            stale.close()
+            stale.unlink()
+            self._segment = shared_memory.SharedMemory(self.segment_name, create = True, size = SEGMENT_SIZE)
+        _created_segments.add(self.segment_name)
+        buffer = self._segment.buf
+        buffer[:SEGMENT_SIZE] = bytes(SEGMENT_SIZE)
+        SEGMENT_HEADER.pack_into(buffer, 0, SEGMENT_MAGIC, SEGMENT_VERSION, 0, 0, os.getpid(), 0, 0)
+
+        if os.path.exists(self.command_path):
+            os.unlink(self.command_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self.command_path)
+        # only the broker's user can send commands, like only it can read the segment
+        os.chmod(self.command_path, 0o600)
+        self._socket.settimeout(0.2)
+
+        for pin in self.grove_analog_pins:
+            self.gpg.set_grove_mode(pin, self.gpg.GROVE_INPUT_ANALOG)
+
+    def close(self):
+        """
+        Remove the shared memory segment and the command socket
+        """
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            if os.path.exists(self.command_path):
+                os.unlink(self.command_path)
+        if self._segment is not None:
+            self._segment.close()
+            try:
+                self._segment.unlink()
+            except FileNotFoundError:
+                pass
+            self._segment = None
+            _created_segments.discard(self.segment_name)
+
+    def start(self):
+        """
+        Poll and execute commands on background threads
+        """
+        if self._threads:
+            return
+        self.open()
+        self._stop_event.clear()
+        for target, name in ((self._poll_loop, "GoPiGo3Broker poll"), (self._command_loop, "GoPiGo3Broker commands")):
+            thread = threading.Thread(target = target, name = name)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout = 1.0):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.close()
+
+    def serve_forever(self):
+        """
+        Run the broker until interrupted
+        """
+        self.start()
+        try:
+            while not self._stop_event.wait(1.0):
+                pass
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def poll_once(self):
+        """
+        Read the telemetry and publish it in the shared memory segment
+        """
+        gpg = self.gpg
+        analog = [0, 0, 0, 0]
+        values = [0, 0]
+        valid = 0
+        with gpg.spi_lock:
+            status_left = gpg.get_motor_status(gpg.MOTOR_LEFT)
+            status_right = gpg.get_motor_status(gpg.MOTOR_RIGHT)
+            voltage_battery = gpg.get_voltage_battery()
+            voltage_5v = gpg.get_voltage_5v()
+            for pin in self.grove_analog_pins:
+                i = GROVE_ANALOG_PINS.index(pin)
+                try:
+                    analog[i] = gpg.get_grove_analog(pin)
+                    valid |= 1 << i
+                except (gopigo3.ValueError, gopigo3.SensorError):
+                    pass
+            for port in self.grove_value_ports:
+                i = GROVE_VALUE_PORTS.index(port)
+                try:
+                    value = gpg.get_grove_value(port)
+                    if isinstance(value, int):
+                        values[i] = value
+                        valid |= 1 << (4 + i)
+                except (gopigo3.ValueError, gopigo3.SensorError):
+                    pass
+        self.cycles += 1
+        self._publish(RECORD.pack(time.monotonic(), self.cycles,
+                                  status_left[0], status_left[1], status_left[2], status_left[3],
+                                  status_right[0], status_right[1], status_right[2], status_right[3],
+                                  voltage_battery, voltage_5v, analog[0], analog[1], analog[2], analog[3],
+                                  values[0], values[1], valid))
+
+    def _publish(self, record):
+        buffer = self._segment.buf
+        sequence = struct.unpack_from("<I", buffer, SEQUENCE_OFFSET)[0]
+        struct.pack_into("<I", buffer, SEQUENCE_OFFSET, (sequence + 1) & 0xFFFFFFFF)
+        buffer[RECORD_OFFSET:RECORD_OFFSET + RECORD.size] = record
+        CRC.pack_into(buffer, RECORD_OFFSET + RECORD.size, zlib.crc32(record) & 0xFFFFFFFF)
+        struct.pack_into("<I", buffer, SEQUENCE_OFFSET, (sequence + 2) & 0xFFFFFFFF)
+
+    def execute(self, data):
+        """
+        Execute one command datagram
+        """
+        try:
+            (name, args, kwargs), _ = decode(data)
+            if name not in COMMAND_METHODS:
+                raise IOError("%s isn't a broker command" % name)
+            getattr(self.gpg, name)(*args, **kwargs)
+            self.commands += 1
+        except Exception as e:
+            self.command_errors += 1
+            self.last_command_error = e
+        struct.pack_into("<II", self._segment.buf, SEGMENT_HEADER.size - 8, self.commands, self.command_errors)
+
+    def _poll(self):
+        try:
+            self.poll_once()
+        except Exception as e:
+            # keep the previous record and try again next cycle
+            self.errors += 1
+            self.last_error = e
+
+    def _poll_loop(self):
+        self._poll_task = PeriodicTask(self._poll, self.period, "GoPiGo3Broker poll")
+        run_periodic(self._poll_task, self._stop_event)
+
+    def _command_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                data = self._socket.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.execute(data)
+
+
+class BrokerClient(object):
+    """
+    Read the telemetry published by a :py:class:`GoPiGo3Broker` and send it commands.
+
+    Reading the telemetry only copies it out of shared memory: no system calls and no SPI transactions, so any
+    number of processes can poll it as often as they like. Commands (set_motor_dps, set_led, ...) are sent to the
+    broker as datagrams and return immediately.
+
+    .. code-block:: python
+
+        gpg = BrokerClient()
+        gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 100)
+        snapshot = gpg.get_snapshot()
+        print(snapshot.encoder_left, snapshot.voltage_battery)
+        print(gpg.get_motor_encoder(gpg.MOTOR_RIGHT))
+
+    The GoPiGo3 constants (MOTOR_LEFT, GROVE_1, ...) are available on the client like on GoPiGo3 objects.
+    """
+
+    def __init__(self, segment_name = DEFAULT_SEGMENT_NAME, command_path = None):
+        """
+        Keyword arguments:
+        segment_name -- the name of the broker's shared memory segment
+        command_path -- the path of the broker's command socket, by default :py:func:`command_socket_path`
+        """
+        self._segment = _attach(segment_name)
+        self._buffer = self._segment.buf
+        magic, version = struct.unpack_from("<4sH", self._buffer, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            raise IOError("%s is not a GoPiGo3 broker segment" % segment_name)
+        self.command_path = command_path if command_path is not None else command_socket_path()
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.retries = 0
+
+    def get_snapshot(self):
+        """
+        Get the latest BrokerSnapshot, or None if the broker hasn't published anything yet
+        """
+        buffer = self._buffer
+        unpack_sequence = struct.Struct("<I").unpack_from
+        end = RECORD_OFFSET + RECORD.size + CRC.size
+        for _ in range(10000):
+            before = unpack_sequence(buffer, SEQUENCE_OFFSET)[0]
+            if before == 0:
+                return None
+            if before & 1:
+                self.retries += 1
+                continue
+            data = bytes(buffer[RECORD_OFFSET:end])
+            if unpack_sequence(buffer, SEQUENCE_OFFSET)[0] != before or \
+               CRC.unpack_from(data, RECORD.size)[0] != zlib.crc32(data[:RECORD.size]) & 0xFFFFFFFF:
+                self.retries += 1
+                continue
+            values = RECORD.unpack_from(data)
+            valid = values[18]
+            analog = dict((pin, values[12 + i]) for i, pin in enumerate(GROVE_ANALOG_PINS) if valid & (1 << i))
+            grove_value = dict((port, values[16 + i]) for i, port in enumerate(GROVE_VALUE_PORTS)
+                               if valid & (1 << (4 + i)))
+            return BrokerSnapshot(values[0], values[1], tuple(values[2:6]), tuple(values[6:10]),
+                                  values[4], values[8], values[10], values[11], analog, grove_value)
+        raise IOError("Couldn't read a consistent GoPiGo3 broker snapshot")
+
+    def get_age(self):
+        """
+        Get the age of the latest snapshot in seconds, or None if nothing has been published yet
+        """
+        snapshot = self.get_snapshot()
+        return time.monotonic() - snapshot.timestamp if snapshot is not None else None
+
+    def get_command_stats(self):
+        """
+        Get the broker's pid and the number of commands it executed and failed, as a dict
+        """
+        _, _, _, _, pid, commands, errors = SEGMENT_HEADER.unpack_from(self._buffer, 0)
+        return {"pid": pid, "commands": commands, "command_errors": errors}
+
+    def _latest(self):
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            raise IOError("The GoPiGo3 broker hasn't published any telemetry yet")
+        return snapshot
+
+    def get_motor_status(self, port):
+        """
+        Get the latest motor status of MOTOR_LEFT or MOTOR_RIGHT, as GoPiGo3.get_motor_status
+        """
+        snapshot = self._latest()
+        if port == self.MOTOR_LEFT:
+            return list(snapshot.motor_status_left)
+        if port == self.MOTOR_RIGHT:
+            return list(snapshot.motor_status_right)
+        raise IOError("get_motor_status error. Must be one motor port at a time. MOTOR_LEFT or MOTOR_RIGHT.")
+
+    def get_motor_encoder(self, port):
+        """
+        Get the latest encoder position of MOTOR_LEFT or MOTOR_RIGHT in degrees
+        """
+        return self.get_motor_status(port)[2]
+
+    def get_voltage_battery(self):
+        return self._latest().voltage_battery
+
+    def get_voltage_5v(self):
+        return self._latest().voltage_5v
+
+    def get_grove_analog(self, pin):
+        """
+        Get the latest raw analog reading of a grove pin the broker samples
+        """
+        analog = self._latest().grove_analog
+        if pin not in analog:
+            raise gopigo3.ValueError("The GoPiGo3 broker doesn't sample grove pin %d" % pin)
+        return analog[pin]
+
+    def send(self, name, *args, **kwargs):
+        """
+        Send a command (one of COMMAND_METHODS) to the broker. Returns immediately.
+        """
+        if name not in COMMAND_METHODS:
+            raise AttributeError("%s isn't a broker command" % name)
+        data = bytearray()
+        encode([name, list(args), kwargs], data)
+        self._socket.sendto(data, self.command_path)
+
+    def __getattr__(self, name):
+        if name not in COMMAND_METHODS:
+            raise AttributeError(name)
+        def command(*args, **kwargs):
+            self.send(name, *args, **kwargs)
+        command.__name__ = name
+        return command
+
+    def close(self):
+        self._socket.close()
+        self._buffer = None
+        self._segment.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# copy the GoPiGo3 class constants (MOTOR_LEFT, GROVE_1, GROVE_TYPE, ...)
+for _name, _value in vars(gopigo3.GoPiGo3).items():
+    if _name.isupper():
+        setattr(BrokerClient, _name, _value)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description = "Share this GoPiGo3 with BrokerClient processes")
+    parser.add_argument("--rate", type = float, default = 100, help = "telemetry updates per second")
+    parser.add_argument("--analog", type = int, nargs = "*", default = [],
+                        help = "grove pins to sample with get_grove_analog (GROVE_1_1 is 1, GROVE_1_2 2, ...)")
+    options = parser.parse_args()
+    broker = GoPiGo3Broker(rate = options.rate, grove_analog_pins = options.analog)
+    print("GoPiGo3 broker: shared memory %s, commands on %s" % (broker.segment_name, broker.command_path))
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,257 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Non-blocking grove I2C transactions for the GoPiGo3
+
+from __future__ import print_function
+from __future__ import division
+
+import collections
+import threading
+import time
+from concurrent.futures import Future
+
+import gopigo3
+
+
+class _Transaction(object):
+    __slots__ = ("future", "addr", "out_bytes", "in_bytes", "submitted", "next_time", "interval", "deadline")
+
+    def __init__(self, addr, out_bytes, in_bytes):
+        self.future = Future()
+        self.addr = addr
+        self.out_bytes = list(out_bytes)
+        self.in_bytes = in_bytes
+        self.submitted = time.monotonic()
+        self.next_time = self.submitted     # when to try starting it, then when to poll it
+        self.interval = 0.0
+        self.deadline = None
+
+
+class _GrovePort(object):
+    def __init__(self, port):
+        self.port = port
+        self.queue = collections.deque()    # transactions not started yet, oldest first
+        self.current = None                 # transaction started on the GoPiGo3 and not read yet
+
+
+class GroveI2CAsync(object):
+    """
+    Grove I2C transactions that don't block the calling thread.
+
+    :py:meth:`transfer` queues a transaction and returns a ``concurrent.futures.Future`` for the bytes read
+    (:py:meth:`transfer_async` returns an asyncio awaitable). One background thread starts the transactions with
+    ``grove_i2c_start`` and collects the results, so a transaction on GROVE_1 and one on GROVE_2 run on the
+    GoPiGo3 at the same time. Transactions on the same port run in the order they were submitted.
+
+    Instead of sleeping through the whole transaction and then busy-polling like ``grove_i2c_transfer``, the first
+    poll waits for the estimated transaction time and later polls back off exponentially from ``poll_interval`` to
+    ``max_poll_interval``.
+
+    The grove ports must be configured for I2C first, with ``gpg.set_grove_type(port, gpg.GROVE_TYPE.I2C)``, and
+    shouldn't be used with ``grove_i2c_transfer`` at the same time.
+
+    .. code-block:: python
+
+        grove_i2c = GroveI2CAsync(gpg)
+        left = grove_i2c.transfer(gpg.GROVE_1, 0x29, [0x14], 12)
+        right = grove_i2c.transfer(gpg.GROVE_2, 0x29, [0x14], 12)
+        print(left.result(), right.result())
+
+    """
+    BYTE_TIME = 0.000115    # each I2C byte takes about 115us at full speed (about 100kbps)
+
+    def __init__(self, gpg, poll_interval = 0.00005, max_poll_interval = 0.001, timeout = 0.005):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object
+        poll_interval -- the first interval between polls after the estimated transaction time, in seconds
+        max_poll_interval -- the longest interval between polls, in seconds
+        timeout -- how long to keep trying to start a transaction, and to wait for the data after the estimated
+                   transaction time, in seconds
+        """
+        self.gpg = gpg
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+
+        self.completed = 0
+        self.failed = 0
+        self.polls = 0
+        self.start_retries = 0
+        self.latency = gopigo3.LatencyHistogram()     # from submit to result
+
+        self._ports = [_GrovePort(gpg.GROVE_1), _GrovePort(gpg.GROVE_2)]
+        self._condition = threading.Condition(threading.Lock())
+        self._stopping = False
+        self._thread = None
+
+    def transfer(self, port, addr, out_bytes, in_bytes = 0):
+        """
+        Queue an I2C transaction
+
+        Keyword arguments:
+        port -- The grove port. GROVE_1 or GROVE_2.
+        addr -- The I2C address of the slave to be addressed.
+        out_bytes -- A list of bytes to send.
+        in_bytes -- The number of bytes to read.
+
+        Returns a concurrent.futures.Future with the list of bytes read, or the exception (I2CError, IOError, ...).
+        """
+        if port == self.gpg.GROVE_1:
+            state = self._ports[0]
+        elif port == self.gpg.GROVE_2:
+            state = self._ports[1]
+        else:
+            raise RuntimeError("Port unsupported. Must get one at a time.")
+        if in_bytes > self.gpg.GROVE_I2C_LENGTH_LIMIT or len(out_bytes) > self.gpg.GROVE_I2C_LENGTH_LIMIT:
+            raise RuntimeError("Length error. Up to %d bytes can be transferred in a single transaction." % self.gpg.GROVE_I2C_LENGTH_LIMIT)
+
+        transaction = _Transaction(addr, out_bytes, in_bytes)
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("GroveI2CAsync is stopped")
+            state.queue.append(transaction)
+            self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target = self._run, name = "GroveI2CAsync")
+                self._thread.daemon = True
+                self._thread.start()
+        return transaction.future
+
+    def transfer_async(self, port, addr, out_bytes, in_bytes = 0):
+        """
+        Like :py:meth:`transfer`, but returns an asyncio future to await in the running event loop
+        """
+        import asyncio
+        return asyncio.wrap_future(self.transfer(port, addr, out_bytes, in_bytes))
+
+    def read_register(self, port, addr, register, in_bytes):
+        """
+        Queue a read of ``in_bytes`` bytes starting at ``register``. Returns a Future like :py:meth:`transfer`.
+        """
+        return self.transfer(port, addr, [register], in_bytes)
+
+    def stop(self, timeout = 1.0):
+        """
+        Finish the queued transactions and stop the background thread
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def get_stats(self):
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "polls": self.polls,
+            "start_retries": self.start_retries,
+            "latency": self.latency.snapshot(),
+        }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                next_time = None
+                for state in self._ports:
+                    transaction = state.current or (state.queue[0] if state.queue else None)
+                    if transaction is not None and (next_time is None or transaction.next_time < next_time):
+                        next_time = transaction.next_time
+                if next_time is None:
+                    if self._stopping:
+                        self._thread = None
+                        return
+                    self._condition.wait()
+                    continue
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+            for state in self._ports:
+                if state.current is not None:
+                    self._poll(state)
+                else:
+                    self._start(state)
+
+    def _start(self, state):
+        with self._condition:
+            if not state.queue:
+                return
+            transaction = state.queue[0]
+        now = time.monotonic()
+        if now < transaction.next_time:
+            return
+        if transaction.deadline is None:
+            transaction.deadline = now + self.timeout
+            if not transaction.future.set_running_or_notify_cancel():
+                self._pop(state)
+                return
+
+        try:
+            self.gpg.grove_i2c_start(state.port, transaction.addr, transaction.out_bytes, transaction.in_bytes)
+        except (IOError, gopigo3.I2CError):
+            # the port is still busy; try again shortly
+            self.start_retries += 1
+            if now > transaction.deadline:
+                self._pop(state)
+                self._fail(transaction, IOError("grove_i2c_transfer error: Timeout trying to start transaction"))
+            else:
+                transaction.next_time = now + self.poll_interval
+            return
+        except Exception as e:
+            self._pop(state)
+            self._fail(transaction, e)
+            return
+
+        self._pop(state)
+        byte_count = 0
+        if len(transaction.out_bytes):
+            byte_count += 1 + len(transaction.out_bytes)
+        if transaction.in_bytes:
+            byte_count += 1 + transaction.in_bytes
+        # no point reading the values before they can be ready
+        transaction.next_time = time.monotonic() + byte_count * self.BYTE_TIME
+        transaction.interval = self.poll_interval
+        transaction.deadline = transaction.next_time + self.timeout
+        state.current = transaction
+
+    def _poll(self, state):
+        transaction = state.current
+        now = time.monotonic()
+        if now < transaction.next_time:
+            return
+        self.polls += 1
+        try:
+            values = self.gpg.get_grove_value(state.port)
+        except (gopigo3.ValueError, gopigo3.SensorError):
+            # not done yet
+            if now > transaction.deadline:
+                state.current = None
+                self._fail(transaction, IOError("grove_i2c_transfer error: Timeout waiting for data"))
+            else:
+                transaction.next_time = now + transaction.interval
+                transaction.interval = min(transaction.interval * 2, self.max_poll_interval)
+            return
+        except Exception as e:
+            state.current = None
+            self._fail(transaction, e)
+            return
+
+        state.current = None
+        self.completed += 1
+        self.latency.record(time.monotonic() - transaction.submitted)
+        transaction.future.set_result(values)
+
+    def _pop(self, state):
+        with self._condition:
+            state.queue.popleft()
+
+    def _fail(self, transaction, error):
+        self.failed += 1
+        transaction.future.set_exception(error)
@@ -0,0 +1,225 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Fixed-rate sampling of the GoPiGo3 grove analog pins into a ring buffer
+
+from __future__ import print_function
+from __future__ import division
+
+import threading
+import time
+
+from gopigo3_scheduler import PeriodicTask, run_periodic
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class GroveAnalogSampler(object):
+    """
+    Sample grove analog pins at a fixed rate on a background thread, into a preallocated NumPy ring buffer.
+
+    Every sample row holds one value per pin (raw 12-bit readings, or volts with ``voltage = True``) and a
+    time.monotonic() timestamp. Samples are numbered from 0 (the sequence number); the sample with sequence
+    ``n`` is stored in row ``n % capacity``. Readers get NumPy views into the ring buffer, not copies:
+
+    .. code-block:: python
+
+        sampler = GroveAnalogSampler(gpg, [gpg.GROVE_1_1, gpg.GROVE_1_2], rate = 500)
+        sampler.start()
+        sequence = 0
+        while True:
+            chunks, sequence, lost = sampler.read_since(sequence)
+            for timestamps, values in chunks:
+                process(timestamps, values)     # values[:, 0] is GROVE_1_1, values[:, 1] is GROVE_1_2
+
+    Views stay valid until the sampler wraps around and overwrites them, ``capacity`` samples later.
+    :py:meth:`is_intact` tells whether data from a sequence number is still in the buffer, so a reader that may
+    have held views for too long can check after using them.
+
+    Needs NumPy (``pip3 install numpy``).
+    """
+
+    def __init__(self, gpg, pins, rate = 200, capacity = 4096, voltage = False, configure = True):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object
+        pins -- a list of grove pins to sample: GROVE_1_1, GROVE_1_2, GROVE_2_1 and/or GROVE_2_2
+        rate -- samples per second
+        capacity -- the number of samples the ring buffer holds
+        voltage -- sample voltages in volts (get_grove_voltage) instead of raw readings (get_grove_analog)
+        configure -- set the pins to GROVE_INPUT_ANALOG when starting
+        """
+        if numpy is None:
+            raise ImportError("GroveAnalogSampler needs numpy. Install it with: pip3 install numpy")
+        if rate <= 0:
+            raise ValueError("rate must be a positive number")
+        if not pins:
+            raise ValueError("at least one pin is needed")
+
+        self.gpg = gpg
+        self.pins = list(pins)
+        self.period = 1.0 / rate
+        self.capacity = int(capacity)
+        self.voltage = voltage
+        self.configure = configure
+
+        self.timestamps = numpy.zeros(self.capacity, dtype = numpy.float64)
+        self.values = numpy.zeros((self.capacity, len(self.pins)),
+                                  dtype = numpy.float32 if voltage else numpy.uint16)
+        self.count = 0      # the number of samples written, which is also the sequence number of the next one
+
+        self.errors = 0
+        self.last_error = None
+
+        self._task = PeriodicTask(self._sample, self.period, "GroveAnalogSampler")
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start sampling on a background thread
+        """
+        if self.is_running():
+            return
+        if self.configure:
+            mask = 0
+            for pin in self.pins:
+                mask |= pin
+            self.gpg.set_grove_mode(mask, self.gpg.GROVE_INPUT_ANALOG)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target = self._run, name = "GroveAnalogSampler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout = 1.0):
+        """
+        Stop sampling. The samples stay in the buffer.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def overruns(self):
+        """
+        The number of samples that ended after the next one was due
+        """
+        return self._task.overruns
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def sample_once(self):
+        """
+        Read every pin once on the calling thread and append the sample to the buffer
+        """
+        gpg = self.gpg
+        read = gpg.get_grove_voltage if self.voltage else gpg.get_grove_analog
+        row = self.count % self.capacity
+        values = self.values[row]
+        # all pins under one lock hold, so they're sampled as close together as possible
+        with gpg.spi_lock:
+            timestamp = time.monotonic()
+            for i, pin in enumerate(self.pins):
+                values[i] = read(pin)
+        self.timestamps[row] = timestamp
+        # publish the row only once it's complete
+        self.count += 1
+
+    def latest(self):
+        """
+        Get the newest sample as (timestamp, values), or None before the first sample. The values are a copy.
+        """
+        count = self.count
+        if count == 0:
+            return None
+        row = (count - 1) % self.capacity
+        return self.timestamps[row], self.values[row].copy()
+
+    def get_chunks(self, start, end = None):
+        """
+        Get samples by sequence number as zero-copy views.
+
+        Keyword arguments:
+        start -- the sequence number of the first sample
+        end -- the sequence number after the last sample, or None for up to the newest sample
+
+        Returns a list of up to two (timestamps, values) chunks, two when the range wraps around the end of the
+        ring buffer. Samples that were already overwritten are left out, and so is the oldest sample of a full
+        buffer, as in :py:meth:`is_intact`.
+        """
+        count = self.count
+        if end is None or end > count:
+            end = count
+        start = max(start, end - self.capacity + 1, 0)
+        if start >= end:
+            return []
+        first = start % self.capacity
+        last = first + (end - start)
+        if last <= self.capacity:
+            return [(self.timestamps[first:last], self.values[first:last])]
+        last -= self.capacity
+        return [(self.timestamps[first:], self.values[first:]),
+                (self.timestamps[:last], self.values[:last])]
+
+    def read_since(self, sequence):
+        """
+        Get the samples newer than the ones already read.
+
+        Keyword arguments:
+        sequence -- the sequence number returned by the previous call, or 0 the first time
+
+        Returns (chunks, sequence, lost): the chunks as :py:meth:`get_chunks`, the sequence number to pass to
+        the next call, and the number of samples that were overwritten before they could be read.
+        """
+        end = self.count
+        lost = max(0, (end - self.capacity + 1) - sequence)
+        return self.get_chunks(sequence + lost, end), end, lost
+
+    def get_window(self, samples):
+        """
+        Get the newest ``samples`` samples as zero-copy chunks, like :py:meth:`get_chunks`
+        """
+        end = self.count
+        return self.get_chunks(end - samples, end)
+
+    def get_array(self, samples):
+        """
+        Get a copy of the newest ``samples`` samples as one (timestamps, values) pair of contiguous arrays
+        """
+        chunks = self.get_window(samples)
+        if not chunks:
+            return self.timestamps[:0].copy(), self.values[:0].copy()
+        return (numpy.concatenate([chunk[0] for chunk in chunks]),
+                numpy.concatenate([chunk[1] for chunk in chunks]))
+
+    def is_intact(self, sequence):
+        """
+        Check that the sample with this sequence number (and every newer one) hasn't been overwritten yet.
+        The oldest sample in a full buffer is reported as gone, since its row is the next one written.
+        """
+        return sequence > self.count - self.capacity
+
+    def _sample(self):
+        try:
+            self.sample_once()
+        except Exception as e:
+            # IOError, or the gopigo3 ValueError for a pin that isn't configured yet
+            self.errors += 1
+            self.last_error = e
+
+    def _run(self):
+        run_periodic(self._task, self._stop_event)
@@ -0,0 +1,321 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Velocity and acceleration limited motion profiles for the GoPiGo3 wheels
+
+from __future__ import print_function
+from __future__ import division
+
+import collections
+import math
+import threading
+import time
+
+from gopigo3_scheduler import PeriodicTask, run_periodic
+
+
+PROFILE_TRAPEZOID = "trapezoid"
+PROFILE_S_CURVE = "s-curve"
+
+
+TrackingSample = collections.namedtuple("TrackingSample", [
+    "time",             # seconds since the start of the move
+    "left_target",      # planned left wheel position in degrees, relative to the start of the move
+    "left_actual",      # left encoder in degrees, relative to the start of the move
+    "right_target",     # planned right wheel position in degrees
+    "right_actual",     # right encoder in degrees
+])
+
+
+class MotionProfile(object):
+    """
+    Point-to-point move from rest to rest, limited in velocity and acceleration.
+
+    With ``shape = PROFILE_TRAPEZOID`` the velocity ramps up linearly, cruises and ramps down linearly. With
+    ``shape = PROFILE_S_CURVE`` the ramps follow half a cosine wave, so the acceleration also starts and ends at
+    zero (no jerk spikes, less wheel slip) at the cost of ramps pi/2 times as long for the same acceleration limit.
+    Short moves that can't reach ``max_velocity`` get a triangular (no cruise) profile.
+    """
+
+    def __init__(self, distance, max_velocity, max_acceleration, shape = PROFILE_TRAPEZOID):
+        """
+        Keyword arguments:
+        distance -- the length of the move, in any unit. Negative to move backwards.
+        max_velocity -- the velocity limit, in units per second
+        max_acceleration -- the acceleration limit, in units per second squared
+        shape -- PROFILE_TRAPEZOID or PROFILE_S_CURVE
+        """
+        if max_velocity <= 0 or max_acceleration <= 0:
+            raise ValueError("max_velocity and max_acceleration must be positive numbers")
+        if shape not in (PROFILE_TRAPEZOID, PROFILE_S_CURVE):
+            raise ValueError("shape must be PROFILE_TRAPEZOID or PROFILE_S_CURVE")
+        self.distance = distance
+        self.shape = shape
+        self._sign = -1.0 if distance < 0 else 1.0
+        length = abs(distance)
+
+        # a ramp from 0 to v takes v / acceleration seconds and covers v * ramp_time / 2 for both shapes
+        acceleration = max_acceleration if shape == PROFILE_TRAPEZOID else max_acceleration * 2.0 / math.pi
+        velocity = min(max_velocity, math.sqrt(length * acceleration))
+        self.peak_velocity = velocity
+        self.ramp_time = velocity / acceleration if velocity > 0 else 0.0
+        self.cruise_time = (length - velocity * self.ramp_time) / velocity if velocity > 0 else 0.0
+        self.duration = 2 * self.ramp_time + self.cruise_time
+        self._length = length
+
+    def _ramp(self, t):
+        # position and velocity t seconds into the acceleration ramp
+        v = self.peak_velocity
+        x = t / self.ramp_time
+        if self.shape == PROFILE_TRAPEZOID:
+            return v * t * x / 2.0, v * x
+        return v / 2.0 * (t - self.ramp_time / math.pi * math.sin(math.pi * x)), v / 2.0 * (1.0 - math.cos(math.pi * x))
+
+    def sample(self, t):
+        """
+        Get the planned (position, velocity) ``t`` seconds after the start of the move
+        """
+        if t <= 0 or self.duration == 0:
+            return 0.0, 0.0
+        if t >= self.duration:
+            return self.distance, 0.0
+        if t < self.ramp_time:
+            position, velocity = self._ramp(t)
+        elif t <= self.ramp_time + self.cruise_time:
+            position = self.peak_velocity * (self.ramp_time / 2.0 + t - self.ramp_time)
+            velocity = self.peak_velocity
+        else:
+            position, velocity = self._ramp(self.duration - t)
+            position = self._length - position
+        return self._sign * position, self._sign * velocity
+
+
+class MotionProfileExecutor(object):
+    """
+    Drive the GoPiGo3 wheels along velocity and acceleration limited profiles.
+
+    A move is planned in advance for both wheels (the wheel with the longer distance gets the full limits and the
+    other one is scaled, so both finish together and arcs keep their shape). A background thread then streams
+    setpoints at a fixed rate: the planned speed of each wheel plus a correction of ``kp`` times its position
+    error, measured with the encoders, through ``set_wheels_dps``. At the end of the profile the wheels are held
+    at the final position with ``set_motor_position`` until they are within ``tolerance`` degrees.
+
+    .. code-block:: python
+
+        motion = MotionProfileExecutor(gpg, max_dps = 400, max_acceleration = 800, shape = PROFILE_S_CURVE)
+        motion.drive_cm(50)
+        motion.turn_degrees(90)
+        print(motion.get_tracking_error())
+
+    Every setpoint cycle records a :py:class:`TrackingSample` in ``samples``.
+    """
+
+    def __init__(self, gpg, rate = 100, max_dps = 300, max_acceleration = 600, shape = PROFILE_TRAPEZOID,
+                 kp = 8.0, tolerance = 2, settle_timeout = 1.0):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object
+        rate -- setpoints per second
+        max_dps -- the default wheel speed limit, in degrees per second
+        max_acceleration -- the default wheel acceleration limit, in degrees per second squared
+        shape -- the default profile shape, PROFILE_TRAPEZOID or PROFILE_S_CURVE
+        kp -- the position error correction, in degrees per second of speed per degree of error
+        tolerance -- how close to the target (degrees) both wheels must get at the end of a move
+        settle_timeout -- how long to wait for the wheels to get within tolerance after the profile ends, in seconds
+        """
+        if rate <= 0:
+            raise ValueError("rate must be a positive number")
+        self.gpg = gpg
+        self.period = 1.0 / rate
+        self.max_dps = max_dps
+        self.max_acceleration = max_acceleration
+        self.shape = shape
+        self.kp = kp
+        self.tolerance = tolerance
+        self.settle_timeout = settle_timeout
+
+        self.samples = []
+        self.last_error = None
+        self.settled = None
+
+        self._task = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def move_wheels(self, left_degrees, right_degrees, max_dps = None, max_acceleration = None, shape = None,
+                    blocking = True):
+        """
+        Rotate the wheels by the given angles along a motion profile
+
+        Keyword arguments:
+        left_degrees -- how far to rotate the left wheel, in degrees
+        right_degrees -- how far to rotate the right wheel, in degrees
+        max_dps -- the speed limit, by default the one given to the constructor
+        max_acceleration -- the acceleration limit, by default the one given to the constructor
+        shape -- the profile shape, by default the one given to the constructor
+        blocking -- wait until the move is done
+
+        Returns True if the wheels reached the target within tolerance (when blocking).
+        """
+        self.stop()
+        if abs(left_degrees) >= abs(right_degrees):
+            profile = MotionProfile(left_degrees, max_dps or self.max_dps, max_acceleration or self.max_acceleration,
+                                    shape or self.shape)
+            left_scale = 1.0
+            right_scale = right_degrees / left_degrees if left_degrees else 0.0
+        else:
+            profile = MotionProfile(right_degrees, max_dps or self.max_dps, max_acceleration or self.max_acceleration,
+                                    shape or self.shape)
+            left_scale = left_degrees / right_degrees
+            right_scale = 1.0
+
+        self.samples = []
+        self.last_error = None
+        self.settled = None
+        self._task = None
+        self._stop_event.clear()
+        self._thread = threading.Thread(target = self._run, args = (profile, left_scale, right_scale),
+                                        name = "MotionProfileExecutor")
+        self._thread.daemon = True
+        self._thread.start()
+        if blocking:
+            return self.wait()
+
+    def drive_mm(self, distance, **kwargs):
+        """
+        Drive straight ``distance`` millimeters (negative to drive backwards). Takes the :py:meth:`move_wheels`
+        keyword arguments.
+        """
+        degrees = distance / self.gpg.WHEEL_CIRCUMFERENCE * 360.0
+        return self.move_wheels(degrees, degrees, **kwargs)
+
+    def drive_cm(self, distance, **kwargs):
+        return self.drive_mm(distance * 10.0, **kwargs)
+
+    def drive_inches(self, distance, **kwargs):
+        return self.drive_mm(distance * 25.4, **kwargs)
+
+    def turn_degrees(self, degrees, **kwargs):
+        """
+        Turn in place by ``degrees`` (positive turns right). Takes the :py:meth:`move_wheels` keyword arguments.
+        """
+        wheel_degrees = self.gpg.WHEEL_BASE_CIRCUMFERENCE * degrees / self.gpg.WHEEL_CIRCUMFERENCE
+        return self.move_wheels(wheel_degrees, -wheel_degrees, **kwargs)
+
+    def wait(self, timeout = None):
+        """
+        Wait until the current move is done. Returns True if the wheels reached the target within tolerance.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+        return bool(self.settled)
+
+    @property
+    def overruns(self):
+        """
+        The number of setpoint cycles of the last move that ended after the next one was due
+        """
+        task = self._task
+        return task.overruns if task is not None else 0
+
+    def is_busy(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        """
+        Abort the current move. The wheels are stopped where they are.
+        """
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+            self._thread = None
+
+    def get_tracking_error(self):
+        """
+        Get a summary of the tracking error of the last move, as a dict with the max, RMS and final error of each
+        wheel in degrees (None before the first setpoint)
+        """
+        samples = self.samples
+        summary = {
+            "samples": len(samples),
+            "duration": samples[-1].time if samples else None,
+            "settled": self.settled,
+            "overruns": self.overruns,
+        }
+        for wheel in ("left", "right"):
+            errors = [getattr(s, wheel + "_actual") - getattr(s, wheel + "_target") for s in samples]
+            summary["max_error_" + wheel] = max(abs(e) for e in errors) if errors else None
+            summary["rms_error_" + wheel] = math.sqrt(sum(e * e for e in errors) / len(errors)) if errors else None
+            summary["final_error_" + wheel] = errors[-1] if errors else None
+        return summary
+
+    def _encoders(self):
+        # both encoders in degrees, from the raw ticks (get_motor_encoder truncates to whole degrees)
+        gpg = self.gpg
+        ticks_per_degree = float(gpg.MOTOR_TICKS_PER_DEGREE)
+        return (gpg.get_motor_encoder_ticks(gpg.MOTOR_LEFT) / ticks_per_degree,
+                gpg.get_motor_encoder_ticks(gpg.MOTOR_RIGHT) / ticks_per_degree)
+
+    def _run(self, profile, left_scale, right_scale):
+        gpg = self.gpg
+        try:
+            left_start, right_start = self._encoders()
+        except Exception as e:
+            self._abort(e)
+            return
+        left_end = left_start + profile.distance * left_scale
+        right_end = right_start + profile.distance * right_scale
+        start = time.monotonic()
+        holding = []
+
+        def cycle():
+            # one setpoint; returns False when the move is over
+            try:
+                t = time.monotonic() - start
+                position, velocity = profile.sample(t)
+                left, right = self._encoders()
+                left -= left_start
+                right -= right_start
+                left_target = position * left_scale
+                right_target = position * right_scale
+                self.samples.append(TrackingSample(t, left_target, left, right_target, right))
+
+                if t < profile.duration:
+                    gpg.set_wheels_dps(velocity * left_scale + self.kp * (left_target - left),
+                                       velocity * right_scale + self.kp * (right_target - right))
+                    return True
+                if not holding:
+                    gpg.set_wheels_position(left_end, right_end)
+                    holding.append(True)
+                if abs(left_target - left) <= self.tolerance and abs(right_target - right) <= self.tolerance:
+                    self.settled = True
+                    return False
+                if t > profile.duration + self.settle_timeout:
+                    self.settled = False
+                    return False
+                return True
+            except Exception as e:
+                # IOError from the SPI bus; don't leave the wheels running
+                self._abort(e)
+                return False
+
+        self._task = PeriodicTask(cycle, self.period, "MotionProfileExecutor")
+        run_periodic(self._task, self._stop_event)
+        if self.settled is None:
+            # aborted by stop()
+            self._abort(None)
+
+    def _abort(self, error):
+        if error is not None:
+            self.last_error = error
+        self.settled = False
+        try:
+            self.gpg.set_wheels_dps(0, 0)
+        except Exception:
+            pass
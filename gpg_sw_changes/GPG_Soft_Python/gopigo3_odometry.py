@@ -0,0 +1,244 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Wheel odometry for the GoPiGo3
+
+from __future__ import print_function
+from __future__ import division
+
+import bisect
+import collections
+import math
+import threading
+import time
+
+from gopigo3_scheduler import PeriodicTask, run_periodic
+
+
+Pose = collections.namedtuple("Pose", [
+    "timestamp",    # time.monotonic() when the encoders were read
+    "x",            # position in mm, along the heading the odometry was reset with
+    "y",            # position in mm, to the left of it
+    "heading",      # heading in radians, counter-clockwise positive
+    "left_ticks",   # raw left encoder position in ticks
+    "right_ticks",  # raw right encoder position in ticks
+])
+
+
+class GoPiGo3Odometry(object):
+    """
+    Track the GoPiGo3 pose from the wheel encoders.
+
+    A background thread reads both encoders in raw ticks at a fixed rate and integrates x, y and heading with
+    differential-drive kinematics, using the wheel diameter, wheel base width and ticks per degree of the GoPiGo3
+    object (so ``gpg3_config.json`` calibrations apply). Every sample is kept in a time-indexed history, which
+    :py:meth:`get_pose_at` interpolates, for example to match a camera frame with the pose at its capture time.
+
+    .. code-block:: python
+
+        gpg = gopigo3.GoPiGo3()
+        with GoPiGo3Odometry(gpg, rate = 200) as odometry:
+            gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 180)
+            time.sleep(2)
+            pose = odometry.get_pose()
+            print(pose.x, pose.y, math.degrees(pose.heading))
+
+    """
+
+    def __init__(self, gpg, rate = 200, history_seconds = 10.0):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object to read the encoders from
+        rate -- the number of encoder samples per second
+        history_seconds -- how long poses are kept in the history
+        """
+        if rate <= 0:
+            raise ValueError("rate must be a positive number")
+
+        self.gpg = gpg
+        self.period = 1.0 / rate
+        self.history_length = max(2, int(rate * history_seconds))
+
+        self.samples = 0
+        self.errors = 0
+        self.last_error = None
+
+        self._task = PeriodicTask(self._sample, self.period, "GoPiGo3Odometry")
+        self._pose = None
+        self._history_lock = threading.Lock()
+        self._history = []
+        self._times = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def get_mm_per_tick(self):
+        """
+        Get the distance a wheel travels per encoder tick in mm
+        """
+        gpg = self.gpg
+        return gpg.WHEEL_CIRCUMFERENCE / (360.0 * gpg.MOTOR_TICKS_PER_DEGREE)
+
+    def start(self):
+        """
+        Start sampling on a background thread. The first sample is taken before returning.
+        """
+        if self.is_running():
+            return
+        if self._pose is None:
+            self.update()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target = self._run, name = "GoPiGo3Odometry")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout = 1.0):
+        """
+        Stop sampling. The pose and history stay available.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def overruns(self):
+        """
+        The number of samples that ended after the next one was due
+        """
+        return self._task.overruns
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reset(self, x = 0.0, y = 0.0, heading = 0.0):
+        """
+        Set the current pose and clear the history. The encoders themselves aren't reset.
+
+        Keyword arguments:
+        x, y -- the position in mm
+        heading -- the heading in radians
+        """
+        # the ticks are read under the lock, so that a sample running at the same time can't overwrite the reset
+        with self._history_lock:
+            left, right, timestamp = self._read_ticks()
+            pose = Pose(timestamp, x, y, heading, left, right)
+            self._history = [pose]
+            self._times = [timestamp]
+            self._pose = pose
+        return pose
+
+    def get_pose(self):
+        """
+        Get the latest pose, or None before the first sample. Never blocks and never touches SPI.
+        """
+        return self._pose
+
+    def get_pose_at(self, timestamp):
+        """
+        Get the pose at a time.monotonic() timestamp, interpolated between the samples around it.
+
+        Returns None if the timestamp is older than the history. Timestamps after the latest sample
+        get the latest pose.
+        """
+        with self._history_lock:
+            times = self._times
+            history = self._history
+            if not history or timestamp < times[0]:
+                return None
+            i = bisect.bisect_right(times, timestamp)
+            if i >= len(history):
+                return history[-1]
+            before = history[i - 1]
+            after = history[i]
+
+        span = after.timestamp - before.timestamp
+        f = (timestamp - before.timestamp) / span if span > 0 else 0.0
+        turn = math.atan2(math.sin(after.heading - before.heading), math.cos(after.heading - before.heading))
+        return Pose(timestamp,
+                    before.x + (after.x - before.x) * f,
+                    before.y + (after.y - before.y) * f,
+                    before.heading + turn * f,
+                    before.left_ticks + (after.left_ticks - before.left_ticks) * f,
+                    before.right_ticks + (after.right_ticks - before.right_ticks) * f)
+
+    def get_history(self, since = None):
+        """
+        Get the poses in the history, oldest first
+
+        Keyword arguments:
+        since -- only the poses after this time.monotonic() timestamp, or None for all of them
+        """
+        with self._history_lock:
+            if since is None:
+                return list(self._history)
+            return self._history[bisect.bisect_right(self._times, since):]
+
+    def update(self):
+        """
+        Read the encoders on the calling thread and integrate the motion since the previous sample.
+
+        Returns the new pose.
+        """
+        # read, integrate and publish under one hold of the lock, so that reset() can't run in between
+        with self._history_lock:
+            left, right, timestamp = self._read_ticks()
+            previous = self._pose
+            if previous is None:
+                pose = Pose(timestamp, 0.0, 0.0, 0.0, left, right)
+            else:
+                mm_per_tick = self.get_mm_per_tick()
+                d_left = (left - previous.left_ticks) * mm_per_tick
+                d_right = (right - previous.right_ticks) * mm_per_tick
+                distance = (d_left + d_right) / 2.0
+                turn = (d_right - d_left) / self.gpg.WHEEL_BASE_WIDTH
+                heading = previous.heading
+                if abs(turn) < 1e-9:
+                    x = previous.x + distance * math.cos(heading)
+                    y = previous.y + distance * math.sin(heading)
+                else:
+                    # exact integration along the arc the robot drove
+                    radius = distance / turn
+                    x = previous.x + radius * (math.sin(heading + turn) - math.sin(heading))
+                    y = previous.y - radius * (math.cos(heading + turn) - math.cos(heading))
+                heading = math.atan2(math.sin(heading + turn), math.cos(heading + turn))
+                pose = Pose(timestamp, x, y, heading, left, right)
+
+            self._history.append(pose)
+            self._times.append(timestamp)
+            if len(self._history) > 2 * self.history_length:
+                # trim in chunks so appending stays cheap
+                del self._history[:-self.history_length]
+                del self._times[:-self.history_length]
+            self._pose = pose
+        self.samples += 1
+        return pose
+
+    def _read_ticks(self):
+        gpg = self.gpg
+        # both encoders under one lock hold, so they're read as close together as possible
+        with gpg.spi_lock:
+            start = time.monotonic()
+            left = gpg.get_motor_encoder_ticks(gpg.MOTOR_LEFT)
+            right = gpg.get_motor_encoder_ticks(gpg.MOTOR_RIGHT)
+            end = time.monotonic()
+        return left, right, (start + end) / 2.0
+
+    def _sample(self):
+        try:
+            self.update()
+        except Exception as e:
+            # skip this sample; the next one covers the motion since the last good one
+            self.errors += 1
+            self.last_error = e
+
+    def _run(self):
+        run_periodic(self._task, self._stop_event)
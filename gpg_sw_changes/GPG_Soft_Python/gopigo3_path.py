@@ -0,0 +1,381 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Pure pursuit path following for the GoPiGo3
+
+from __future__ import print_function
+from __future__ import division
+
+import bisect
+import collections
+import math
+import threading
+import time
+
+from gopigo3_odometry import GoPiGo3Odometry
+from gopigo3_scheduler import PeriodicTask, run_periodic
+
+
+PathPoint = collections.namedtuple("PathPoint", [
+    "segment",      # index of the path segment, from waypoint ``segment`` to waypoint ``segment + 1``
+    "x",            # the point on the path in mm
+    "y",
+    "distance",     # the distance along the path from the first waypoint, in mm
+    "offset",       # the distance from the query point, in mm
+])
+
+
+class PathIndex(object):
+    """
+    A polyline with a uniform grid index over its segments, for fast nearest-segment lookups.
+
+    Every segment is registered in the grid cells its bounding box covers, so a lookup only measures the segments
+    in the cells around the query point instead of every segment of the path.
+    """
+
+    def __init__(self, waypoints, cell_size = 100.0):
+        """
+        Keyword arguments:
+        waypoints -- a list of (x, y) points in mm, at least two
+        cell_size -- the size of the grid cells in mm
+        """
+        points = [(float(x), float(y)) for x, y in waypoints]
+        # repeated waypoints would make zero length segments
+        self.points = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+        if len(self.points) < 2:
+            raise ValueError("a path needs at least two different waypoints")
+        self.cell_size = float(cell_size)
+
+        self.distances = [0.0]      # distance along the path at each waypoint
+        for (x0, y0), (x1, y1) in zip(self.points, self.points[1:]):
+            self.distances.append(self.distances[-1] + math.hypot(x1 - x0, y1 - y0))
+        self.length = self.distances[-1]
+
+        self._cells = collections.defaultdict(list)
+        for segment, ((x0, y0), (x1, y1)) in enumerate(zip(self.points, self.points[1:])):
+            for cx in range(self._cell(min(x0, x1)), self._cell(max(x0, x1)) + 1):
+                for cy in range(self._cell(min(y0, y1)), self._cell(max(y0, y1)) + 1):
+                    self._cells[(cx, cy)].append(segment)
+        xs = [p[0] for p in self.points]
+        ys = [p[1] for p in self.points]
+        self._bounds = (self._cell(min(xs)), self._cell(min(ys)), self._cell(max(xs)), self._cell(max(ys)))
+
+    def _cell(self, value):
+        return int(math.floor(value / self.cell_size))
+
+    def project(self, segment, x, y):
+        """
+        Get the PathPoint on ``segment`` closest to (x, y)
+        """
+        x0, y0 = self.points[segment]
+        x1, y1 = self.points[segment + 1]
+        dx = x1 - x0
+        dy = y1 - y0
+        length = self.distances[segment + 1] - self.distances[segment]
+        t = ((x - x0) * dx + (y - y0) * dy) / (length * length)
+        t = max(0.0, min(1.0, t))
+        px = x0 + t * dx
+        py = y0 + t * dy
+        return PathPoint(segment, px, py, self.distances[segment] + t * length, math.hypot(x - px, y - py))
+
+    def nearest(self, x, y, min_distance = None, max_distance = None):
+        """
+        Get the PathPoint closest to (x, y)
+
+        Keyword arguments:
+        min_distance, max_distance -- only consider the part of the path between these distances along it (mm),
+                                      for example to keep a follower from skipping ahead where a path crosses itself
+        """
+        cx = self._cell(x)
+        cy = self._cell(y)
+        x_min, y_min, x_max, y_max = self._bounds
+        # rings of cells around the query point, from the first one that overlaps the path's cells to the last one,
+        # stopping early once a ring is farther away than the best point found
+        first_ring = max(0, x_min - cx, cx - x_max, y_min - cy, cy - y_max)
+        last_ring = max(cx - x_min, x_max - cx, cy - y_min, y_max - cy)
+        best = None
+        seen = set()
+        for ring in range(first_ring, last_ring + 1):
+            if best is not None and (ring - 1) * self.cell_size > best.offset:
+                break
+            for segment in self._ring_segments(cx, cy, ring, seen):
+                if min_distance is not None and self.distances[segment + 1] < min_distance:
+                    continue
+                if max_distance is not None and self.distances[segment] > max_distance:
+                    continue
+                point = self.project(segment, x, y)
+                if best is None or point.offset < best.offset:
+                    best = point
+        return best
+
+    def _ring_segments(self, cx, cy, ring, seen):
+        segments = []
+        for i in range(-ring, ring + 1):
+            for cell in ((cx + i, cy - ring), (cx + i, cy + ring), (cx - ring, cy + i), (cx + ring, cy + i)):
+                for segment in self._cells.get(cell, ()):
+                    if segment not in seen:
+                        seen.add(segment)
+                        segments.append(segment)
+        return segments
+
+    def point_at(self, distance):
+        """
+        Get the (x, y) point ``distance`` mm along the path, clamped to its ends
+        """
+        if distance <= 0:
+            return self.points[0]
+        if distance >= self.length:
+            return self.points[-1]
+        segment = bisect.bisect_right(self.distances, distance) - 1
+        x0, y0 = self.points[segment]
+        x1, y1 = self.points[segment + 1]
+        f = (distance - self.distances[segment]) / (self.distances[segment + 1] - self.distances[segment])
+        return x0 + (x1 - x0) * f, y0 + (y1 - y0) * f
+
+    def heading_at(self, segment):
+        """
+        Get the direction of a segment in radians, counter-clockwise from the x axis
+        """
+        x0, y0 = self.points[segment]
+        x1, y1 = self.points[segment + 1]
+        return math.atan2(y1 - y0, x1 - x0)
+
+
+class PurePursuitFollower(object):
+    """
+    Follow a list of waypoints continuously with pure pursuit, steering with the wheel encoder odometry.
+
+    Every cycle the follower finds the point of the path nearest to the robot, picks the point ``lookahead`` mm
+    further along the path and drives both wheels along the arc that reaches it. The robot doesn't stop at the
+    waypoints; it only slows down for the end of the path. The signed lateral error (distance from the path, positive
+    with the robot to the left of it) is recorded every cycle.
+
+    Waypoints are in mm in the odometry frame: x forward and y to the left of the robot when the odometry was
+    reset. Without an ``odometry`` object the follower makes its own and resets it when the run starts.
+
+    .. code-block:: python
+
+        follower = PurePursuitFollower(gpg, [(0, 0), (500, 0), (500, 500), (0, 500)], speed = 150)
+        follower.follow()
+        print(follower.get_stats()["lateral_error_rms"])
+
+    """
+
+    def __init__(self, gpg, waypoints, odometry = None, lookahead = 120.0, speed = 150.0, max_dps = 500,
+                 deceleration = 300.0, goal_tolerance = 15.0, rate = 50, timeout = None):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object
+        waypoints -- a list of (x, y) points in mm
+        odometry -- a GoPiGo3Odometry to take the pose from, or None to make one
+        lookahead -- how far ahead along the path to steer to, in mm. Shorter tracks closer but weaves more.
+        speed -- the driving speed in mm per second
+        max_dps -- the speed limit of each wheel in degrees per second; both wheels slow down together to keep it
+        deceleration -- how quickly to slow down for the end of the path, in mm per second squared
+        goal_tolerance -- how close to the last waypoint the run ends, in mm
+        rate -- control cycles per second
+        timeout -- give up after this many seconds, or None to never give up
+        """
+        if rate <= 0:
+            raise ValueError("rate must be a positive number")
+        self.gpg = gpg
+        self.path = PathIndex(waypoints, cell_size = max(lookahead, 20.0))
+        self.odometry = odometry
+        self.lookahead = lookahead
+        self.speed = speed
+        self.max_dps = max_dps
+        self.deceleration = deceleration
+        self.goal_tolerance = goal_tolerance
+        self.period = 1.0 / rate
+        self.timeout = timeout
+
+        self.progress = 0.0         # distance along the path of the nearest point, in mm
+        self.lateral_error = None   # signed distance from the path in mm of the latest cycle
+        self.lateral_errors = []    # (timestamp, lateral error) of every cycle
+        self.cycles = 0
+        self.errors = 0
+        self.last_error = None
+        self.done = False
+        self.reached = False
+
+        self._task = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start following the path on a background thread
+        """
+        if self.is_running():
+            return
+        if self.odometry is None:
+            self.odometry = GoPiGo3Odometry(self.gpg)
+            self.odometry.reset()
+        self.progress = 0.0
+        self.lateral_error = None
+        self.lateral_errors = []
+        self.cycles = 0
+        self.errors = 0
+        self.done = False
+        self._task = None
+        self.reached = False
+        self._stop_event.clear()
+        self._thread = threading.Thread(target = self._run, name = "PurePursuitFollower")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def follow(self):
+        """
+        Follow the path and wait until the end of it. Returns True if the last waypoint was reached.
+        """
+        self.start()
+        self.wait()
+        return self.reached
+
+    def wait(self, timeout = None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.done
+
+    def stop(self, timeout = 1.0):
+        """
+        Stop following the path and stop the motors
+        """
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def overruns(self):
+        """
+        The number of control cycles that ended after the next one was due
+        """
+        task = self._task
+        return task.overruns if task is not None else 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_lateral_error(self):
+        """
+        Get the signed distance from the path (mm) of the latest control cycle, positive to the left of the path
+        """
+        return self.lateral_error
+
+    def get_stats(self):
+        """
+        Get the progress and lateral error statistics of the run as a dict (distances in mm)
+        """
+        errors = [e for _, e in self.lateral_errors]
+        return {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "errors": self.errors,
+            "done": self.done,
+            "reached": self.reached,
+            "progress": self.progress,
+            "path_length": self.path.length,
+            "lateral_error": self.lateral_error,
+            "lateral_error_max": max(abs(e) for e in errors) if errors else None,
+            "lateral_error_mean": sum(abs(e) for e in errors) / len(errors) if errors else None,
+            "lateral_error_rms": math.sqrt(sum(e * e for e in errors) / len(errors)) if errors else None,
+        }
+
+    def _pose(self):
+        if self.odometry.is_running():
+            return self.odometry.get_pose()
+        return self.odometry.update()
+
+    def _step(self):
+        """
+        One control cycle. Returns False once the end of the path is reached.
+        """
+        gpg = self.gpg
+        path = self.path
+        pose = self._pose()
+
+        # the nearest point, searched only a little ahead of the progress so far
+        nearest = path.nearest(pose.x, pose.y, min_distance = self.progress - self.lookahead,
+                               max_distance = self.progress + 2 * self.lookahead)
+        if nearest is None:
+            nearest = path.nearest(pose.x, pose.y)
+        self.progress = max(self.progress, nearest.distance)
+        side = math.sin(path.heading_at(nearest.segment)) * (pose.x - nearest.x) - \
+               math.cos(path.heading_at(nearest.segment)) * (pose.y - nearest.y)
+        self.lateral_error = -nearest.offset if side > 0 else nearest.offset
+        self.lateral_errors.append((pose.timestamp, self.lateral_error))
+
+        end_x, end_y = path.points[-1]
+        to_goal = math.hypot(end_x - pose.x, end_y - pose.y)
+        remaining = path.length - self.progress
+        if to_goal <= self.goal_tolerance and remaining <= self.goal_tolerance + self.lookahead:
+            self.reached = True
+            return False
+
+        # the goal point in the robot frame
+        goal_x, goal_y = path.point_at(self.progress + self.lookahead)
+        if path.length - self.progress < self.lookahead:
+            goal_x, goal_y = end_x, end_y
+        dx = goal_x - pose.x
+        dy = goal_y - pose.y
+        cos_h = math.cos(pose.heading)
+        sin_h = math.sin(pose.heading)
+        forward = dx * cos_h + dy * sin_h
+        left = -dx * sin_h + dy * cos_h
+        distance_squared = forward * forward + left * left
+        curvature = 2.0 * left / distance_squared if distance_squared > 0 else 0.0
+
+        speed = min(self.speed, math.sqrt(2.0 * self.deceleration * max(remaining, to_goal)))
+        speed = max(speed, self.speed * 0.2)
+        half_width = gpg.WHEEL_BASE_WIDTH / 2.0
+        dps_per_mm = 360.0 / gpg.WHEEL_CIRCUMFERENCE
+        left_dps = speed * (1.0 - curvature * half_width) * dps_per_mm
+        right_dps = speed * (1.0 + curvature * half_width) * dps_per_mm
+        fastest = max(abs(left_dps), abs(right_dps))
+        if fastest > self.max_dps:
+            left_dps *= self.max_dps / fastest
+            right_dps *= self.max_dps / fastest
+        gpg.set_wheels_dps(left_dps, right_dps)
+        return True
+
+    def _run(self):
+        start = time.monotonic()
+
+        def cycle():
+            # returns False to end the run
+            try:
+                if not self._step():
+                    return False
+            except IOError as e:
+                # skip this cycle; the motors keep the last speeds
+                self.errors += 1
+                self.last_error = e
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+                return False
+            self.cycles += 1
+            return self.timeout is None or time.monotonic() - start <= self.timeout
+
+        try:
+            self._task = PeriodicTask(cycle, self.period, "PurePursuitFollower")
+            run_periodic(self._task, self._stop_event)
+        finally:
+            self.done = True
+            try:
+                self.gpg.set_wheels_dps(0, 0)
+            except Exception as e:
+                # the thread is ending anyway; leave the error for the caller to see
+                self.errors += 1
+                self.last_error = e
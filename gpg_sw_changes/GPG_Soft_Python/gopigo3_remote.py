@@ -0,0 +1,625 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Remote access to a GoPiGo3 over TCP or a Unix socket
+
+from __future__ import print_function
+from __future__ import division
+
+import itertools
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import gopigo3
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+
+DEFAULT_PORT = 8130
+PROTOCOL_VERSION = 1
+
+# GoPiGo3 methods the server exposes by default
+REMOTE_METHODS = [name for name in gopigo3.INSTRUMENTED_METHODS if name != "spi_transfer_message"] + [
+    "get_spi_speed", "set_robot_constants", "get_instrumentation",
+]
+
+# Every frame is a 4 byte length followed by the payload. Payloads start with a request id and an opcode.
+FRAME_HEADER = struct.Struct("<I")
+REQUEST_HEADER = struct.Struct("<IB")
+CALL_HEADER = struct.Struct("<H")       # method index, then the encoded args list and kwargs dict
+BATCH_HEADER = struct.Struct("<H")      # number of calls, then every call like OP_CALL
+OP_HELLO = 0
+OP_CALL = 1
+OP_BATCH = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+MAX_FRAME_SIZE = 1 << 24
+
+
+class RemoteError(RuntimeError):
+    """Exception raised for a remote exception that has no matching local exception class"""
+
+
+# Values are encoded with a one byte tag followed by the value
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_LENGTH = struct.Struct("<I")
+
+
+def encode(value, out):
+    """
+    Append the binary encoding of ``value`` to the bytearray ``out``. Supports None, bool, int, float, str, bytes,
+    lists, tuples and dicts of those.
+    """
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        out += b"i"
+        out += _INT.pack(value)
+    elif isinstance(value, float):
+        out += b"d"
+        out += _FLOAT.pack(value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out += b"s"
+        out += _LENGTH.pack(len(data))
+        out += data
+    elif isinstance(value, (bytes, bytearray)):
+        out += b"b"
+        out += _LENGTH.pack(len(value))
+        out += value
+    elif isinstance(value, (list, tuple)):
+        out += b"l" if isinstance(value, list) else b"u"
+        out += _LENGTH.pack(len(value))
+        for item in value:
+            encode(item, out)
+    elif isinstance(value, dict):
+        out += b"m"
+        out += _LENGTH.pack(len(value))
+        for key, item in value.items():
+            encode(key, out)
+            encode(item, out)
+    else:
+        raise TypeError("can't send a %s to or from a remote GoPiGo3" % type(value).__name__)
+
+
+def decode(data, offset = 0):
+    """
+    Decode the value at ``offset`` of ``data``. Returns (value, offset after the value).
+    """
+    tag = data[offset:offset + 1]
+    offset += 1
+    if tag == b"N":
+        return None, offset
+    if tag == b"T":
+        return True, offset
+    if tag == b"F":
+        return False, offset
+    if tag == b"i":
+        return _INT.unpack_from(data, offset)[0], offset + 8
+    if tag == b"d":
+        return _FLOAT.unpack_from(data, offset)[0], offset + 8
+    if tag in (b"s", b"b"):
+        length = _LENGTH.unpack_from(data, offset)[0]
+        offset += 4
+        value = bytes(data[offset:offset + length])
+        return (value.decode("utf-8") if tag == b"s" else value), offset + length
+    if tag in (b"l", b"u"):
+        length = _LENGTH.unpack_from(data, offset)[0]
+        offset += 4
+        items = []
+        for _ in range(length):
+            item, offset = decode(data, offset)
+            items.append(item)
+        return (items if tag == b"l" else tuple(items)), offset
+    if tag == b"m":
+        length = _LENGTH.unpack_from(data, offset)[0]
+        offset += 4
+        result = {}
+        for _ in range(length):
+            key, offset = decode(data, offset)
+            result[key], offset = decode(data, offset)
+        return result, offset
+    raise IOError("Invalid remote GoPiGo3 data (tag %r)" % tag)
+
+
+def _error_value(error):
+    return (type(error).__name__, str(error))
+
+
+def _exception(value):
+    # the local exception for a remote (class name, message)
+    name, message = value
+    cls = getattr(gopigo3, name, None) or getattr(builtins, name, None)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        return cls(message)
+    return RemoteError("%s: %s" % (name, message))
+
+
+def _connect_address(address):
+    if isinstance(address, str):
+        return socket.AF_UNIX, address
+    return socket.AF_INET, tuple(address)
+
+
+class _FrameReader(object):
+    """Splits the bytes received on a socket into frame payloads"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray()
+
+    def read_frames(self):
+        """
+        Wait for data and return every complete frame payload received, or None at the end of the stream
+        """
+        while True:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                return None
+            self.buffer += chunk
+            frames = []
+            offset = 0
+            while len(self.buffer) - offset >= 4:
+                length = FRAME_HEADER.unpack_from(self.buffer, offset)[0]
+                if length > MAX_FRAME_SIZE:
+                    raise IOError("Remote GoPiGo3 frame too large (%d bytes)" % length)
+                if len(self.buffer) - offset - 4 < length:
+                    break
+                frames.append(bytes(self.buffer[offset + 4:offset + 4 + length]))
+                offset += 4 + length
+            del self.buffer[:offset]
+            if frames:
+                return frames
+
+
+def _frame(payload):
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class GoPiGo3Server(object):
+    """
+    Serve a GoPiGo3 object to :py:class:`RemoteGoPiGo3` clients over TCP or a Unix socket.
+
+    Each connection is handled on its own thread. Requests are executed in the order they arrive, and the replies
+    to all the requests that arrived together (pipelined by the client) go back in one send. A batch request runs
+    under the SPI transaction lock, so its calls aren't interleaved with other clients.
+
+    .. code-block:: python
+
+        server = GoPiGo3Server(gopigo3.GoPiGo3(), ("0.0.0.0", DEFAULT_PORT))
+        server.serve_forever()
+
+    There is no authentication: anyone who can connect can drive the robot. The default address only accepts
+    connections from the robot itself; give ``("0.0.0.0", port)`` to accept them from the network.
+
+    The server can also be started from the command line: ``python3 -m gopigo3_remote --host 0.0.0.0``.
+    """
+
+    def __init__(self, gpg = None, address = ("127.0.0.1", DEFAULT_PORT), methods = None):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object to serve, by default a new one
+        address -- a (host, port) tuple for TCP, or a path for a Unix socket
+        methods -- the method names to expose, by default REMOTE_METHODS
+        """
+        self.gpg = gpg if gpg is not None else gopigo3.GoPiGo3()
+        self.methods = list(methods if methods is not None else REMOTE_METHODS)
+        self._functions = [getattr(self.gpg, name) for name in self.methods]
+        self.address = address
+
+        self.connections = 0
+        self.requests = 0
+        self.calls = 0
+
+        family, bind_address = _connect_address(address)
+        if family == socket.AF_UNIX and os.path.exists(bind_address):
+            os.unlink(bind_address)
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(bind_address)
+        self._socket.listen(8)
+        self._stopping = False
+        self._thread = None
+        self._clients = set()
+        self._lock = threading.Lock()
+
+    def get_address(self):
+        """
+        Get the address the server listens on (with the actual port if port 0 was given)
+        """
+        return self._socket.getsockname()
+
+    def start(self):
+        """
+        Accept connections on a background thread
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target = self.serve_forever, name = "GoPiGo3Server")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def serve_forever(self):
+        while not self._stopping:
+            try:
+                sock, _ = self._socket.accept()
+            except OSError:
+                # the listening socket was closed by stop()
+                break
+            if sock.family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self._clients.add(sock)
+            self.connections += 1
+            thread = threading.Thread(target = self._serve_client, args = (sock,), name = "GoPiGo3Server client")
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        """
+        Stop accepting connections and close the connected clients
+        """
+        self._stopping = True
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        with self._lock:
+            clients = list(self._clients)
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+            self._thread = None
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _serve_client(self, sock):
+        reader = _FrameReader(sock)
+        try:
+            while True:
+                frames = reader.read_frames()
+                if frames is None:
+                    break
+                replies = bytearray()
+                for payload in frames:
+                    replies += _frame(self._handle(payload))
+                sock.sendall(replies)
+        except Exception:
+            # connection lost, or a frame without a request header: drop the client
+            pass
+        finally:
+            with self._lock:
+                self._clients.discard(sock)
+            sock.close()
+
+    def _handle(self, payload):
+        request_id, op = REQUEST_HEADER.unpack_from(payload, 0)
+        self.requests += 1
+        try:
+            return self._handle_request(request_id, op, payload)
+        except Exception as e:
+            # truncated data, invalid UTF-8, lists nested too deep...
+            reply = bytearray(REQUEST_HEADER.pack(request_id, STATUS_ERROR))
+            encode(_error_value(IOError("Invalid remote GoPiGo3 request: %s" % e)), reply)
+            return bytes(reply)
+
+    def _handle_request(self, request_id, op, payload):
+        offset = REQUEST_HEADER.size
+        reply = bytearray(REQUEST_HEADER.pack(request_id, STATUS_OK))
+        if op == OP_HELLO:
+            encode({"version": PROTOCOL_VERSION, "methods": self.methods, "constants": self._constants()}, reply)
+        elif op == OP_CALL:
+            status, value, offset = self._call(payload, offset)
+            reply[4] = status
+            reply += value
+        elif op == OP_BATCH:
+            count = BATCH_HEADER.unpack_from(payload, offset)[0]
+            offset += BATCH_HEADER.size
+            # a list of (status, result) tuples, encoded by hand around the already encoded results
+            reply += b"l" + _LENGTH.pack(count)
+            with self.gpg.spi_lock:
+                for _ in range(count):
+                    status, value, offset = self._call(payload, offset)
+                    reply += b"u" + _LENGTH.pack(2)
+                    encode(status, reply)
+                    reply += value
+        else:
+            reply[4] = STATUS_ERROR
+            encode(("IOError", "Unknown remote GoPiGo3 request %d" % op), reply)
+        return bytes(reply)
+
+    def _call(self, payload, offset):
+        # returns the status, the encoded result or error, and the offset of the next call
+        method = CALL_HEADER.unpack_from(payload, offset)[0]
+        args, offset = decode(payload, offset + CALL_HEADER.size)
+        kwargs, offset = decode(payload, offset)
+        self.calls += 1
+        value = bytearray()
+        try:
+            if method >= len(self._functions):
+                raise IOError("Unknown remote GoPiGo3 method %d" % method)
+            encode(self._functions[method](*args, **kwargs), value)
+            return STATUS_OK, value, offset
+        except Exception as e:
+            value = bytearray()
+            encode(_error_value(e), value)
+            return STATUS_ERROR, value, offset
+
+    def _constants(self):
+        # robot constants that can differ from the class defaults (wheel diameter, ticks per degree, ...)
+        constants = {}
+        for name, value in vars(self.gpg).items():
+            if name.isupper() and isinstance(value, (int, float, str)):
+                constants[name] = value
+        return constants
+
+
+class RemoteBatch(object):
+    """
+    Calls sent to the server together and executed there under one SPI lock hold. Get it with
+    :py:meth:`RemoteGoPiGo3.batch`. Every method call returns a Future; the results arrive when the batch is sent.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = self._client._method_index(name)
+        def queue(*args, **kwargs):
+            future = Future()
+            self._calls.append((method, args, kwargs, future))
+            return future
+        queue.__name__ = name
+        return queue
+
+    def send(self):
+        """
+        Send the queued calls. Returns the list of their Futures.
+        """
+        calls = self._calls
+        self._calls = []
+        if calls:
+            self._client._send_batch(calls)
+        return [call[3] for call in calls]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.send()
+
+
+class RemoteGoPiGo3(object):
+    """
+    Drop-in replacement for GoPiGo3 that calls the methods of a GoPiGo3 served by :py:class:`GoPiGo3Server`.
+
+    Method calls block until the reply arrives, like local calls, and raise the same exceptions (IOError,
+    gopigo3.SensorError, ...). Constants such as MOTOR_LEFT, GROVE_TYPE or the robot's WHEEL_DIAMETER work as usual.
+    To avoid paying a network round trip per call, calls can be pipelined or batched:
+
+    .. code-block:: python
+
+        gpg = RemoteGoPiGo3(("robot.local", DEFAULT_PORT))
+        gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 100)
+
+        # pipelined: both requests are sent before waiting for the replies
+        left = gpg.call_async("get_motor_encoder", gpg.MOTOR_LEFT)
+        right = gpg.call_async("get_motor_encoder", gpg.MOTOR_RIGHT)
+        print(left.result(), right.result())
+
+        # batched: one request, executed on the robot under one SPI lock hold
+        with gpg.batch() as batch:
+            left = batch.get_motor_encoder(gpg.MOTOR_LEFT)
+            right = batch.get_motor_encoder(gpg.MOTOR_RIGHT)
+        print(left.result(), right.result())
+
+    """
+
+    def __init__(self, address = ("127.0.0.1", DEFAULT_PORT), timeout = 10.0):
+        """
+        Keyword arguments:
+        address -- the server address: a (host, port) tuple for TCP, or a path for a Unix socket
+        timeout -- how long to wait for a reply, in seconds, or None to wait forever
+        """
+        self.timeout = timeout
+        family, connect_address = _connect_address(address)
+        self._socket = socket.create_connection(connect_address, timeout) if family == socket.AF_INET \
+            else socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            self._socket.connect(connect_address)
+        else:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.settimeout(None)
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._thread = threading.Thread(target = self._read_replies, name = "RemoteGoPiGo3")
+        self._thread.daemon = True
+        self._thread.start()
+
+        hello = self._result(self._request(OP_HELLO, b""), timeout)
+        if hello["version"] != PROTOCOL_VERSION:
+            raise IOError("Remote GoPiGo3 protocol version %d is not supported" % hello["version"])
+        self.methods = hello["methods"]
+        self._method_indexes = dict((name, i) for i, name in enumerate(self.methods))
+        for name, value in hello["constants"].items():
+            setattr(self, name, value)
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self.__dict__.get("_method_indexes", ()):
+            raise AttributeError(name)
+        def method(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        method.__name__ = name
+        return method
+
+    def call(self, name, *args, **kwargs):
+        """
+        Call a GoPiGo3 method on the server and return its result
+        """
+        return self._result(self.call_async(name, *args, **kwargs), self.timeout)
+
+    def call_async(self, name, *args, **kwargs):
+        """
+        Send a call without waiting for the reply. Returns a concurrent.futures.Future for the result.
+        """
+        body = bytearray(CALL_HEADER.pack(self._method_index(name)))
+        encode(list(args), body)
+        encode(kwargs, body)
+        return self._request(OP_CALL, body)
+
+    def batch(self):
+        """
+        Start a :py:class:`RemoteBatch`
+        """
+        return RemoteBatch(self)
+
+    def close(self):
+        self._closed = True
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _method_index(self, name):
+        try:
+            return self._method_indexes[name]
+        except KeyError:
+            raise AttributeError("The remote GoPiGo3 doesn't provide %s" % name)
+
+    def _send_batch(self, calls):
+        body = bytearray(BATCH_HEADER.pack(len(calls)))
+        for method, args, kwargs, _ in calls:
+            body += CALL_HEADER.pack(method)
+            encode(list(args), body)
+            encode(kwargs, body)
+        futures = [call[3] for call in calls]
+        batch_future = self._request(OP_BATCH, body)
+
+        def resolve(result):
+            try:
+                results = result.result()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, (status, value) in zip(futures, results):
+                if status == STATUS_OK:
+                    future.set_result(value)
+                else:
+                    future.set_exception(_exception(value))
+        batch_future.add_done_callback(resolve)
+
+    def _request(self, op, body):
+        future = Future()
+        with self._send_lock:
+            if self._closed:
+                raise IOError("The remote GoPiGo3 connection is closed")
+            request_id = next(self._ids)
+            future.request_id = request_id
+            self._pending[request_id] = future
+            payload = REQUEST_HEADER.pack(request_id, op) + bytes(body)
+            try:
+                self._socket.sendall(_frame(payload))
+            except Exception:
+                self._pending.pop(request_id, None)
+                raise
+        return future
+
+    def _result(self, future, timeout):
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # a reply that arrives later is dropped; fail the future for anyone else waiting on it
+            if self._pending.pop(future.request_id, None) is not None:
+                future.set_exception(IOError("No reply from the remote GoPiGo3 within %s seconds" % timeout))
+            raise
+
+    def _read_replies(self):
+        reader = _FrameReader(self._socket)
+        error = IOError("The remote GoPiGo3 connection was closed")
+        try:
+            while True:
+                frames = reader.read_frames()
+                if frames is None:
+                    break
+                for payload in frames:
+                    request_id, status = REQUEST_HEADER.unpack_from(payload, 0)
+                    value, _ = decode(payload, REQUEST_HEADER.size)
+                    future = self._pending.pop(request_id, None)
+                    if future is None:
+                        continue
+                    if status == STATUS_OK:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(_exception(value))
+        except Exception as e:
+            # connection lost, or a reply that can't be decoded: the stream can't be trusted anymore
+            error = e if isinstance(e, (IOError, OSError)) else IOError("Invalid remote GoPiGo3 reply: %s" % e)
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        with self._send_lock:
+            self._closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(error)
+
+
+# copy the GoPiGo3 class constants (MOTOR_LEFT, GROVE_1, GROVE_TYPE, ...) so the client works as a drop-in
+for _name, _value in vars(gopigo3.GoPiGo3).items():
+    if _name.isupper():
+        setattr(RemoteGoPiGo3, _name, _value)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description = "Serve this GoPiGo3 to RemoteGoPiGo3 clients")
+    parser.add_argument("--host", default = "127.0.0.1", help = "the address to listen on, 0.0.0.0 for every interface")
+    parser.add_argument("--port", type = int, default = DEFAULT_PORT)
+    parser.add_argument("--unix", help = "listen on this Unix socket path instead of TCP")
+    options = parser.parse_args()
+    server = GoPiGo3Server(address = options.unix or (options.host, options.port))
+    print("Serving the GoPiGo3 on %s" % (server.get_address(),))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,269 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Fixed-rate scheduler for robot control loops
+
+from __future__ import print_function
+from __future__ import division
+
+import os
+import threading
+import time
+
+from gopigo3 import LatencyHistogram
+
+
+class PeriodicTask(object):
+    """
+    A callback run by a :py:class:`GoPiGo3Scheduler` at a fixed period, with its timing statistics.
+
+    ``jitter`` records how late each cycle started relative to its deadline and ``duration`` how long the
+    callback took. A cycle that ends after the next deadline is an overrun; the deadlines it ran over are
+    skipped (``missed_cycles``) instead of being run back to back, and the task stays in phase.
+
+    A task can also run on a thread of its own with :py:func:`run_periodic`.
+    """
+
+    def __init__(self, callback, period, name = None):
+        if period <= 0:
+            raise ValueError("period must be a positive number")
+        self.callback = callback
+        self.period = period
+        self.name = name if name is not None else getattr(callback, "__name__", "task")
+
+        self.jitter = LatencyHistogram()
+        self.duration = LatencyHistogram()
+        self.cycles = 0
+        self.overruns = 0
+        self.missed_cycles = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_start = None
+        self.deadline = None    # time.monotonic() of the next cycle
+
+    def _run_cycle(self, start):
+        # returns what the callback returned (None if it raised)
+        deadline = self.deadline
+        self.jitter.record(start - deadline)
+        result = None
+        try:
+            result = self.callback()
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+        end = time.monotonic()
+        self.duration.record(end - start)
+        self.cycles += 1
+        self.last_start = start
+
+        # absolute deadlines: the period never drifts with the callback duration
+        deadline += self.period
+        if end > deadline:
+            self.overruns += 1
+            skipped = int((end - deadline) / self.period) + 1
+            self.missed_cycles += skipped
+            deadline += skipped * self.period
+        self.deadline = deadline
+        return result
+
+    def get_stats(self):
+        """
+        Get the timing statistics as a dict. Jitter and duration histograms are in seconds.
+        """
+        return {
+            "name": self.name,
+            "period": self.period,
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "missed_cycles": self.missed_cycles,
+            "errors": self.errors,
+            "jitter": self.jitter.snapshot(),
+            "duration": self.duration.snapshot(),
+        }
+
+    def reset_stats(self):
+        self.jitter.reset()
+        self.duration.reset()
+        self.cycles = 0
+        self.overruns = 0
+        self.missed_cycles = 0
+        self.errors = 0
+        self.last_error = None
+
+
+def run_periodic(task, stop_event, first = None):
+    """
+    Run a :py:class:`PeriodicTask` on the calling thread until ``stop_event`` is set or the callback returns
+    False, for components that own a thread instead of sharing a :py:class:`GoPiGo3Scheduler`.
+
+    Keyword arguments:
+    task -- the PeriodicTask
+    stop_event -- a threading.Event that stops the loop, also while it waits for the next cycle
+    first -- the time.monotonic() of the first cycle, by default right away
+    """
+    task.deadline = first if first is not None else time.monotonic()
+    while not stop_event.is_set():
+        delay = task.deadline - time.monotonic()
+        if delay > 0 and stop_event.wait(delay):
+            break
+        if task._run_cycle(time.monotonic()) is False:
+            break
+
+
+class GoPiGo3Scheduler(object):
+    """
+    Run control callbacks at fixed rates on one thread, against absolute time.monotonic() deadlines.
+
+    Unlike ``time.sleep(period)`` in a loop, the rate doesn't drift by the time the loop body takes.
+    Tasks run earliest deadline first. The thread can optionally run with real-time (SCHED_FIFO) priority and
+    be pinned to CPUs, which needs root or CAP_SYS_NICE; if that isn't allowed the scheduler still runs and
+    ``realtime_error`` says why.
+
+    .. code-block:: python
+
+        scheduler = GoPiGo3Scheduler(realtime_priority = 50, cpus = [3])
+        scheduler.add(motor_loop, rate = 200)
+        scheduler.add(imu_loop, rate = 100)
+        scheduler.start()
+        ...
+        scheduler.stop()
+        print(scheduler.get_stats())
+
+    """
+
+    def __init__(self, realtime_priority = None, cpus = None, spin_time = 0.0, name = "GoPiGo3Scheduler"):
+        """
+        Keyword arguments:
+        realtime_priority -- SCHED_FIFO priority (1 to 99) for the scheduler thread, or None for normal scheduling
+        cpus -- the CPU numbers to pin the scheduler thread to, or None for any CPU
+        spin_time -- busy-wait for this last part (in seconds) of each wait instead of sleeping, for less jitter
+                     at the cost of CPU time. 0 never busy-waits.
+        name -- the name of the scheduler thread
+        """
+        self.realtime_priority = realtime_priority
+        self.cpus = cpus
+        self.spin_time = spin_time
+        self.name = name
+        self.realtime_error = None
+
+        self._tasks = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    def add(self, callback, rate = None, period = None, name = None):
+        """
+        Add a callback to run at a fixed rate. The first cycle runs as soon as possible.
+
+        Keyword arguments:
+        callback -- a function without arguments
+        rate -- cycles per second (give either rate or period)
+        period -- seconds per cycle
+        name -- the name used in the statistics, by default the name of the callback
+
+        Returns the PeriodicTask.
+        """
+        if (rate is None) == (period is None):
+            raise ValueError("give either rate or period")
+        if period is None:
+            if rate <= 0:
+                raise ValueError("rate must be a positive number")
+            period = 1.0 / rate
+        task = PeriodicTask(callback, period, name)
+        task.deadline = time.monotonic()
+        with self._lock:
+            self._tasks.append(task)
+        self._wake_event.set()
+        return task
+
+    def remove(self, task):
+        with self._lock:
+            if task in self._tasks:
+                self._tasks.remove(task)
+        self._wake_event.set()
+
+    def get_tasks(self):
+        with self._lock:
+            return list(self._tasks)
+
+    def start(self):
+        """
+        Run the tasks on a background thread
+        """
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target = self.run, name = self.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout = 1.0):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def run(self):
+        """
+        Run the tasks on the calling thread until :py:meth:`stop` is called
+        """
+        self._apply_realtime()
+        now = time.monotonic()
+        with self._lock:
+            for task in self._tasks:
+                task.deadline = max(task.deadline, now) if task.deadline is not None else now
+
+        while not self._stop_event.is_set():
+            # cleared before choosing, so a task added meanwhile wakes up the wait below
+            self._wake_event.clear()
+            with self._lock:
+                task = min(self._tasks, key = lambda t: t.deadline) if self._tasks else None
+            if task is None:
+                self._wake_event.wait(0.1)
+                continue
+
+            if not self._wait_until(task.deadline):
+                # woken up early: stopping, or the tasks changed
+                continue
+            task._run_cycle(time.monotonic())
+
+    def _wait_until(self, deadline):
+        remaining = deadline - time.monotonic() - self.spin_time
+        if remaining > 0:
+            if self._wake_event.wait(remaining):
+                return False
+        while time.monotonic() < deadline:
+            pass
+        return not self._stop_event.is_set()
+
+    def _apply_realtime(self):
+        self.realtime_error = None
+        try:
+            if self.cpus is not None:
+                # pid 0 is the calling thread
+                os.sched_setaffinity(0, self.cpus)
+            if self.realtime_priority is not None:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.realtime_priority))
+        except (AttributeError, OSError) as e:
+            # not permitted (needs root or CAP_SYS_NICE) or not supported on this platform
+            self.realtime_error = e
+
+    def get_stats(self):
+        """
+        Get the statistics of every task as a dict of task name to :py:meth:`PeriodicTask.get_stats`
+        """
+        return dict((task.name, task.get_stats()) for task in self.get_tasks())
@@ -0,0 +1,637 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# In-process simulator of the GoPiGo3 firmware SPI protocol
+
+from __future__ import print_function
+from __future__ import division
+
+import random
+import struct
+import threading
+import time
+
+import gopigo3
+
+
+MSG = gopigo3.GoPiGo3.SPI_MESSAGE_TYPE
+GROVE_TYPE = gopigo3.GoPiGo3.GROVE_TYPE
+GROVE_STATE = gopigo3.GoPiGo3.GROVE_STATE
+
+MOTOR_FLOAT = gopigo3.GoPiGo3.MOTOR_FLOAT
+
+MOTOR_FLAG_LOW_VOLTAGE_FLOAT = 0x01
+MOTOR_FLAG_OVERLOADED        = 0x02
+
+GROVE_PINS = [gopigo3.GoPiGo3.GROVE_1_1, gopigo3.GoPiGo3.GROVE_1_2, gopigo3.GoPiGo3.GROVE_2_1, gopigo3.GoPiGo3.GROVE_2_2]
+GROVE_ANALOG_MODES = (gopigo3.GoPiGo3.GROVE_INPUT_ANALOG, gopigo3.GoPiGo3.GROVE_INPUT_ANALOG_PULLUP, gopigo3.GoPiGo3.GROVE_INPUT_ANALOG_PULLDOWN)
+GROVE_DIGITAL_INPUT_MODES = (gopigo3.GoPiGo3.GROVE_INPUT_DIGITAL, gopigo3.GoPiGo3.GROVE_INPUT_DIGITAL_PULLUP, gopigo3.GoPiGo3.GROVE_INPUT_DIGITAL_PULLDOWN)
+
+I2C_BYTE_TIME = 0.000115   # each grove I2C byte takes about 115uS at 100kbps
+
+
+class SimI2CRegisterDevice(object):
+    """
+    A simulated I2C slave with an auto-incrementing register pointer.
+
+    The first byte written sets the register pointer, the rest are written to consecutive registers.
+    Reads return consecutive registers starting at the pointer.
+    """
+
+    def __init__(self, registers = None, size = 256):
+        self.registers = bytearray(size)
+        if registers:
+            for reg, value in registers.items():
+                self.registers[reg] = value & 0xFF
+        self.pointer = 0
+
+    def i2c_transfer(self, out_bytes, in_bytes):
+        if len(out_bytes):
+            self.pointer = out_bytes[0] % len(self.registers)
+            for b in out_bytes[1:]:
+                self.registers[self.pointer] = b & 0xFF
+                self.pointer = (self.pointer + 1) % len(self.registers)
+        result = []
+        for _ in range(in_bytes):
+            result.append(self.registers[self.pointer])
+            self.pointer = (self.pointer + 1) % len(self.registers)
+        return result
+
+
+class _SimMotor(object):
+    """ Firmware-side state of one motor, in encoder ticks """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.mode = "float"
+        self.power_command = 0
+        self.position_target = 0.0   # ticks, not offset
+        self.dps_target = 0.0        # ticks per second
+        self.limit_power = 0         # percent, 0 is no limit
+        self.limit_dps = 0           # ticks per second, 0 is no limit
+        self.position_kp = 25
+        self.position_kd = 70
+
+        self.position = 0.0          # ticks
+        self.velocity = 0.0          # ticks per second
+        self.offset = 0              # encoder offset in ticks
+        self.power = MOTOR_FLOAT     # applied power in percent, or MOTOR_FLOAT
+        self.flags = 0
+
+    def encoder(self):
+        return int(round(self.position)) - self.offset
+
+    def _power_for_velocity(self, target):
+        # feed forward plus a proportional term, like the firmware's speed controller
+        max_speed = self.sim.motor_max_dps * self.sim.ticks_per_degree
+        return (target / max_speed) * 100.0 + (target - self.velocity) / max_speed * 100.0 * self.sim.motor_speed_kp
+
+    def step(self, dt, supply_scale, low_voltage):
+        max_speed = self.sim.motor_max_dps * self.sim.ticks_per_degree
+        power_limit = self.limit_power if 0 < self.limit_power < 100 else 100
+
+        target_velocity = None
+        if low_voltage or self.mode == "float":
+            power = None
+        elif self.mode == "power":
+            power = max(-power_limit, min(power_limit, self.power_command))
+        else:
+            if self.mode == "dps":
+                target_velocity = self.dps_target
+            else:
+                target_velocity = (self.position_target - self.position) * self.sim.motor_position_gain
+            speed_limit = self.limit_dps if self.limit_dps > 0 else max_speed
+            target_velocity = max(-speed_limit, min(speed_limit, target_velocity))
+            power = self._power_for_velocity(target_velocity)
+            power = max(-power_limit, min(power_limit, power))
+
+        if power is None:
+            # floating, the motor coasts to a stop
+            steady_velocity = 0.0
+            tau = self.sim.motor_coast_time_constant
+            self.power = MOTOR_FLOAT
+        else:
+            steady_velocity = power / 100.0 * max_speed * supply_scale
+            tau = self.sim.motor_time_constant
+            self.power = int(round(power))
+
+        alpha = min(1.0, dt / tau) if tau > 0 else 1.0
+        self.velocity += (steady_velocity - self.velocity) * alpha
+        self.position += self.velocity * dt
+
+        flags = 0
+        if low_voltage:
+            flags |= MOTOR_FLAG_LOW_VOLTAGE_FLOAT
+        if target_velocity is not None and abs(target_velocity - self.velocity) > 0.2 * max_speed and abs(power) >= power_limit:
+            flags |= MOTOR_FLAG_OVERLOADED
+        self.flags = flags
+
+
+class GoPiGo3Simulator(gopigo3.SPIBackend):
+    """
+    SPI backend that answers like the GoPiGo3 firmware, without any hardware.
+
+    Covers every message in ``GoPiGo3.SPI_MESSAGE_TYPE``: identification, voltages, LEDs, servos, motor power / position / dps
+    control with limits and encoder offsets, and the grove ports (digital, analog, PWM, ultrasonic, IR remotes and I2C).
+    Replies carry the 0xA5 marker at byte 3 like the firmware. A request for another SPI address gets no reply.
+
+    The motors are modeled as a first-order lag toward a speed proportional to the applied power and battery voltage,
+    and the encoders integrate that speed.
+
+    Simulated time runs at ``time_scale`` times real time (faster than real time with ``time_scale > 1``).
+    With ``time_scale = None`` the clock only moves by :py:meth:`advance` and by the wire time of each SPI transfer,
+    which makes runs deterministic.
+
+    .. code-block:: python
+
+        import gopigo3, gopigo3_sim
+
+        sim = gopigo3_sim.GoPiGo3Simulator(time_scale = None)
+        gpg = gopigo3.GoPiGo3(spi_backend = sim)
+        gpg.set_motor_dps(gpg.MOTOR_LEFT + gpg.MOTOR_RIGHT, 360)
+        sim.advance(1.0)
+        print(gpg.get_motor_encoder(gpg.MOTOR_LEFT))
+
+    The simulator can also be selected for every GoPiGo3 object in a process with the environment variable
+    ``GOPIGO3_SPI_BACKEND=sim``.
+    """
+
+    def __init__(self, address = 8, time_scale = 1.0, spi_speed_hz = 500000,
+                 manufacturer = "Dexter Industries", board = "GoPiGo3",
+                 firmware_version = "1.0.0", hardware_version = "3.0.0", serial_number = "0123456789ABCDEF0123456789ABCDEF",
+                 battery_voltage = 9.6, battery_resistance = 0.6, battery_drain = 0.0, low_voltage_threshold = 6.5,
+                 voltage_5v = 5.0, motor_gear_ratio = 120, encoder_ticks_per_rotation = 6, motor_max_dps = 1000.0,
+                 motor_time_constant = 0.05, motor_coast_time_constant = 0.15, grove_reference_voltage = 5.0,
+                 max_reliable_speed_hz = None, seed = None):
+        """
+        Keyword arguments:
+        address -- the SPI address the simulated board answers to
+        time_scale -- simulated seconds per real second, or None to only advance time explicitly
+        spi_speed_hz -- SPI clock used for the wire time of each transfer when time_scale is None
+        battery_voltage -- open circuit battery voltage in volts
+        battery_resistance -- voltage sag in volts with both motors at full power
+        battery_drain -- voltage lost per second with both motors at full power
+        low_voltage_threshold -- below this battery voltage the motors float and report LOW_VOLTAGE_FLOAT
+        motor_max_dps -- output shaft speed in degrees per second at full power and nominal battery voltage
+        motor_time_constant -- time constant of the motor speed response in seconds
+        grove_reference_voltage -- grove analog voltage that reads as 4095
+        max_reliable_speed_hz -- above this SPI clock some replies get a corrupted bit, like a board that can't keep up.
+                                 None never corrupts replies.
+        seed -- seed for the random reply corruption
+        """
+        self.address = address
+        self.time_scale = time_scale
+        self.spi_speed_hz = spi_speed_hz
+        self.max_reliable_speed_hz = max_reliable_speed_hz
+        self._random = random.Random(seed)
+
+        self.manufacturer = manufacturer
+        self.board = board
+        self.firmware_version = firmware_version
+        self.hardware_version = hardware_version
+        self.serial_number = serial_number
+
+        self.battery_nominal_voltage = battery_voltage
+        self.battery_voltage = battery_voltage
+        self.battery_resistance = battery_resistance
+        self.battery_drain = battery_drain
+        self.low_voltage_threshold = low_voltage_threshold
+        self.voltage_5v = voltage_5v
+
+        self.ticks_per_degree = (motor_gear_ratio * encoder_ticks_per_rotation) / 360.0
+        self.motor_max_dps = motor_max_dps
+        self.motor_time_constant = motor_time_constant
+        self.motor_coast_time_constant = motor_coast_time_constant
+        self.motor_speed_kp = 2.0
+        self.motor_position_gain = 8.0   # ticks per second of speed per tick of position error
+        self.motors = [_SimMotor(self), _SimMotor(self)]
+
+        self.leds = {}
+        self.servos = {gopigo3.GoPiGo3.SERVO_1: 0, gopigo3.GoPiGo3.SERVO_2: 0}
+
+        self.grove_reference_voltage = grove_reference_voltage
+        self.grove_type = [0, 0]
+        self.grove_mode = dict((pin, gopigo3.GoPiGo3.GROVE_INPUT_DIGITAL) for pin in GROVE_PINS)
+        self.grove_output = dict((pin, 0) for pin in GROVE_PINS)
+        self.grove_pwm_duty = dict((pin, 0.0) for pin in GROVE_PINS)
+        self.grove_pwm_frequency = [24000, 24000]
+        self.grove_analog = dict((pin, 0) for pin in GROVE_PINS)
+        self.grove_digital = dict((pin, 0) for pin in GROVE_PINS)
+        self.grove_value = [0, 0]       # ultrasonic distance in mm, IR remote code(s)
+        self.i2c_devices = [{}, {}]     # per port: I2C address -> device
+        self._i2c = [None, None]        # per port: (completion time, state, data) of the last transaction
+
+        self.transfers = 0
+        self.message_counts = {}
+
+        self._lock = threading.Lock()
+        self._real_start = time.monotonic()
+        self._time_offset = 0.0
+        self._last_update = 0.0
+
+        self._handlers = {
+            MSG.GET_MANUFACTURER: self._get_manufacturer,
+            MSG.GET_NAME: self._get_name,
+            MSG.GET_HARDWARE_VERSION: self._get_hardware_version,
+            MSG.GET_FIRMWARE_VERSION: self._get_firmware_version,
+            MSG.GET_ID: self._get_id,
+            MSG.SET_LED: self._set_led,
+            MSG.GET_VOLTAGE_5V: self._get_voltage_5v,
+            MSG.GET_VOLTAGE_VCC: self._get_voltage_vcc,
+            MSG.SET_SERVO: self._set_servo,
+            MSG.SET_MOTOR_PWM: self._set_motor_pwm,
+            MSG.SET_MOTOR_POSITION: self._set_motor_position,
+            MSG.SET_MOTOR_POSITION_KP: self._set_motor_position_kp,
+            MSG.SET_MOTOR_POSITION_KD: self._set_motor_position_kd,
+            MSG.SET_MOTOR_DPS: self._set_motor_dps,
+            MSG.SET_MOTOR_LIMITS: self._set_motor_limits,
+            MSG.OFFSET_MOTOR_ENCODER: self._offset_motor_encoder,
+            MSG.GET_MOTOR_ENCODER_LEFT: self._get_motor_encoder,
+            MSG.GET_MOTOR_ENCODER_RIGHT: self._get_motor_encoder,
+            MSG.GET_MOTOR_STATUS_LEFT: self._get_motor_status,
+            MSG.GET_MOTOR_STATUS_RIGHT: self._get_motor_status,
+            MSG.SET_GROVE_TYPE: self._set_grove_type,
+            MSG.SET_GROVE_MODE: self._set_grove_mode,
+            MSG.SET_GROVE_STATE: self._set_grove_state,
+            MSG.SET_GROVE_PWM_DUTY: self._set_grove_pwm_duty,
+            MSG.SET_GROVE_PWM_FREQUENCY: self._set_grove_pwm_frequency,
+            MSG.GET_GROVE_VALUE_1: self._get_grove_value,
+            MSG.GET_GROVE_VALUE_2: self._get_grove_value,
+            MSG.START_GROVE_I2C_1: self._start_grove_i2c,
+            MSG.START_GROVE_I2C_2: self._start_grove_i2c,
+        }
+        for msg in (MSG.GET_GROVE_STATE_1_1, MSG.GET_GROVE_STATE_1_2, MSG.GET_GROVE_STATE_2_1, MSG.GET_GROVE_STATE_2_2):
+            self._handlers[msg] = self._get_grove_state
+        for msg in (MSG.GET_GROVE_VOLTAGE_1_1, MSG.GET_GROVE_VOLTAGE_1_2, MSG.GET_GROVE_VOLTAGE_2_1, MSG.GET_GROVE_VOLTAGE_2_2):
+            self._handlers[msg] = self._get_grove_voltage
+        for msg in (MSG.GET_GROVE_ANALOG_1_1, MSG.GET_GROVE_ANALOG_1_2, MSG.GET_GROVE_ANALOG_2_1, MSG.GET_GROVE_ANALOG_2_2):
+            self._handlers[msg] = self._get_grove_analog
+
+    # --- time -------------------------------------------------------------
+
+    def now(self):
+        """
+        Get the simulated time in seconds since the simulator was created
+        """
+        if self.time_scale is None:
+            return self._time_offset
+        return self._time_offset + (time.monotonic() - self._real_start) * self.time_scale
+
+    def advance(self, seconds):
+        """
+        Advance the simulated time and update the motors. In real-time mode this jumps ahead of the clock.
+        """
+        with self._lock:
+            self._time_offset += seconds
+            self._update()
+
+    def _update(self):
+        now = self.now()
+        dt = now - self._last_update
+        self._last_update = now
+        while dt > 0:
+            step = min(dt, 0.001)   # 1ms steps keep the motor model stable
+            dt -= step
+            load = (abs(self.motors[0].power) if self.motors[0].power != MOTOR_FLOAT else 0) + \
+                   (abs(self.motors[1].power) if self.motors[1].power != MOTOR_FLOAT else 0)
+            load = min(1.0, load / 200.0)
+            self.battery_voltage = max(0.0, self.battery_voltage - self.battery_drain * load * step)
+            loaded_voltage = self.get_loaded_battery_voltage()
+            low_voltage = loaded_voltage < self.low_voltage_threshold
+            supply_scale = loaded_voltage / self.battery_nominal_voltage if self.battery_nominal_voltage else 1.0
+            for motor in self.motors:
+                motor.step(step, supply_scale, low_voltage)
+
+    def get_loaded_battery_voltage(self):
+        """
+        Get the battery voltage under the current motor load, as reported over SPI
+        """
+        load = 0
+        for motor in self.motors:
+            if motor.power != MOTOR_FLOAT:
+                load += abs(motor.power)
+        return max(0.0, self.battery_voltage - self.battery_resistance * min(1.0, load / 200.0))
+
+    # --- inputs for tests -------------------------------------------------
+
+    def set_grove_analog(self, pin, value):
+        """
+        Set the 12-bit raw reading of a grove analog input pin
+        """
+        self.grove_analog[pin] = max(0, min(4095, int(value)))
+
+    def set_grove_voltage(self, pin, volts):
+        """
+        Set the voltage on a grove analog input pin
+        """
+        self.set_grove_analog(pin, round(volts / self.grove_reference_voltage * 4095))
+
+    def set_grove_digital(self, pin, state):
+        """
+        Set the state of a grove digital input pin
+        """
+        self.grove_digital[pin] = 1 if state else 0
+
+    def set_grove_port_value(self, port, value):
+        """
+        Set the value reported by an ultrasonic ranger (distance in mm) or IR remote (code or list of 4 codes)
+        """
+        self.grove_value[self._grove_port_index(port)] = value
+
+    def attach_i2c_device(self, port, address, device):
+        """
+        Attach a simulated I2C slave to a grove port
+
+        Keyword arguments:
+        port -- GROVE_1 or GROVE_2
+        address -- the 7-bit I2C address
+        device -- an object with ``i2c_transfer(out_bytes, in_bytes)`` returning the bytes read (like SimI2CRegisterDevice),
+                  or a function with the same signature
+        """
+        self.i2c_devices[self._grove_port_index(port)][address & 0x7F] = device
+
+    # --- SPIBackend ---------------------------------------------------------
+
+    def xfer2(self, data_out):
+        out = [int(b) & 0xFF for b in data_out]
+        reply = [0] * len(out)
+        with self._lock:
+            self.transfers += 1
+            if self.time_scale is None and self.spi_speed_hz:
+                self._time_offset += len(out) * 8.0 / self.spi_speed_hz
+            self._update()
+            if len(out) >= 2 and out[0] == self.address:
+                message_type = out[1]
+                self.message_counts[message_type] = self.message_counts.get(message_type, 0) + 1
+                handler = self._handlers.get(message_type)
+                if handler is not None:
+                    handler(message_type, out, reply)
+            if self.max_reliable_speed_hz and self.spi_speed_hz > self.max_reliable_speed_hz and len(reply) > 3:
+                # the faster the clock, the more often a bit is lost
+                if self._random.random() < min(1.0, 0.005 * self.spi_speed_hz / self.max_reliable_speed_hz):
+                    reply[self._random.randrange(3, len(reply))] ^= 1 << self._random.randrange(8)
+        return reply
+
+    def get_speed_hz(self):
+        return self.spi_speed_hz
+
+    def set_speed_hz(self, speed_hz):
+        self.spi_speed_hz = speed_hz
+
+    # --- helpers --------------------------------------------------------------
+
+    @staticmethod
+    def _put(reply, offset, data):
+        # copy as much of the data as the request length allows, like the firmware clocking out its reply buffer
+        for i, b in enumerate(data):
+            if offset + i >= len(reply):
+                break
+            reply[offset + i] = b & 0xFF
+
+    def _reply(self, reply, fmt, *values):
+        reply_len = len(reply)
+        if reply_len > 3:
+            reply[3] = 0xA5
+        self._put(reply, 4, bytearray(struct.pack(fmt, *values)))
+
+    @staticmethod
+    def _value_16(out, offset):
+        return struct.unpack(">h", bytes(out[offset:offset + 2]))[0] if len(out) >= offset + 2 else 0
+
+    @staticmethod
+    def _value_32(out, offset):
+        return struct.unpack(">i", bytes(out[offset:offset + 4]))[0] if len(out) >= offset + 4 else 0
+
+    def _motors_for(self, port):
+        motors = []
+        if port & gopigo3.GoPiGo3.MOTOR_LEFT:
+            motors.append(self.motors[0])
+        if port & gopigo3.GoPiGo3.MOTOR_RIGHT:
+            motors.append(self.motors[1])
+        return motors
+
+    @staticmethod
+    def _grove_port_index(port):
+        if port == gopigo3.GoPiGo3.GROVE_1:
+            return 0
+        if port == gopigo3.GoPiGo3.GROVE_2:
+            return 1
+        raise ValueError("grove port must be GROVE_1 or GROVE_2")
+
+    @staticmethod
+    def _version_number(version):
+        parts = [int(p) if p.isdigit() else 0 for p in version.split(".")] + [0, 0, 0]
+        return parts[0] * 1000000 + parts[1] * 1000 + parts[2]
+
+    # --- message handlers -----------------------------------------------------
+
+    def _get_manufacturer(self, message_type, out, reply):
+        reply[3] = 0xA5
+        self._put(reply, 4, bytearray(self.manufacturer.encode("ascii")[:20]))
+
+    def _get_name(self, message_type, out, reply):
+        reply[3] = 0xA5
+        self._put(reply, 4, bytearray(self.board.encode("ascii")[:20]))
+
+    def _get_hardware_version(self, message_type, out, reply):
+        self._reply(reply, ">I", self._version_number(self.hardware_version))
+
+    def _get_firmware_version(self, message_type, out, reply):
+        self._reply(reply, ">I", self._version_number(self.firmware_version))
+
+    def _get_id(self, message_type, out, reply):
+        reply[3] = 0xA5
+        self._put(reply, 4, bytearray.fromhex(self.serial_number))
+
+    def _set_led(self, message_type, out, reply):
+        if len(out) >= 6:
+            for bit in range(8):
+                if out[2] & (1 << bit):
+                    self.leds[1 << bit] = (out[3], out[4], out[5])
+
+    def _get_voltage_5v(self, message_type, out, reply):
+        self._reply(reply, ">H", int(round(self.voltage_5v * 1000)))
+
+    def _get_voltage_vcc(self, message_type, out, reply):
+        self._reply(reply, ">H", int(round(self.get_loaded_battery_voltage() * 1000)))
+
+    def _set_servo(self, message_type, out, reply):
+        if len(out) >= 5:
+            us = (out[3] << 8) | out[4]
+            for servo in self.servos:
+                if out[2] & servo:
+                    self.servos[servo] = us
+
+    def _set_motor_pwm(self, message_type, out, reply):
+        if len(out) >= 4:
+            power = out[3] - 0x100 if out[3] & 0x80 else out[3]
+            for motor in self._motors_for(out[2]):
+                if power == MOTOR_FLOAT:
+                    motor.mode = "float"
+                else:
+                    motor.mode = "power"
+                    motor.power_command = max(-100, min(100, power))
+
+    def _set_motor_position(self, message_type, out, reply):
+        position = self._value_32(out, 3)
+        for motor in self._motors_for(out[2]):
+            motor.mode = "position"
+            motor.position_target = float(position + motor.offset)
+
+    def _set_motor_position_kp(self, message_type, out, reply):
+        for motor in self._motors_for(out[2]):
+            motor.position_kp = out[3] if len(out) > 3 else motor.position_kp
+
+    def _set_motor_position_kd(self, message_type, out, reply):
+        for motor in self._motors_for(out[2]):
+            motor.position_kd = out[3] if len(out) > 3 else motor.position_kd
+
+    def _set_motor_dps(self, message_type, out, reply):
+        dps = self._value_16(out, 3)
+        for motor in self._motors_for(out[2]):
+            motor.mode = "dps"
+            motor.dps_target = float(dps)
+
+    def _set_motor_limits(self, message_type, out, reply):
+        if len(out) >= 6:
+            dps = (out[4] << 8) | out[5]
+            for motor in self._motors_for(out[2]):
+                motor.limit_power = out[3]
+                motor.limit_dps = dps
+
+    def _offset_motor_encoder(self, message_type, out, reply):
+        offset = self._value_32(out, 3)
+        for motor in self._motors_for(out[2]):
+            motor.offset += offset
+
+    def _get_motor_encoder(self, message_type, out, reply):
+        motor = self.motors[0 if message_type == MSG.GET_MOTOR_ENCODER_LEFT else 1]
+        self._reply(reply, ">i", motor.encoder())
+
+    def _get_motor_status(self, message_type, out, reply):
+        motor = self.motors[0 if message_type == MSG.GET_MOTOR_STATUS_LEFT else 1]
+        dps = max(-0x8000, min(0x7FFF, int(round(motor.velocity))))
+        self._reply(reply, ">Bbih", motor.flags, motor.power, motor.encoder(), dps)
+
+    def _set_grove_type(self, message_type, out, reply):
+        if len(out) >= 4:
+            for p in range(2):
+                if ((out[2] >> (p * 2)) & 3) == 3:
+                    self.grove_type[p] = out[3]
+                    self._i2c[p] = None
+
+    def _set_grove_mode(self, message_type, out, reply):
+        if len(out) >= 4:
+            for pin in GROVE_PINS:
+                if out[2] & pin:
+                    self.grove_mode[pin] = out[3]
+
+    def _set_grove_state(self, message_type, out, reply):
+        if len(out) >= 4:
+            for pin in GROVE_PINS:
+                if out[2] & pin:
+                    self.grove_output[pin] = 1 if out[3] else 0
+
+    def _set_grove_pwm_duty(self, message_type, out, reply):
+        if len(out) >= 5:
+            duty = ((out[3] << 8) | out[4]) / 10.0
+            for pin in GROVE_PINS:
+                if out[2] & pin:
+                    self.grove_pwm_duty[pin] = duty
+
+    def _set_grove_pwm_frequency(self, message_type, out, reply):
+        if len(out) >= 5:
+            for p in range(2):
+                if ((out[2] >> (p * 2)) & 3) == 3:
+                    self.grove_pwm_frequency[p] = (out[3] << 8) | out[4]
+
+    def _pin_for(self, message_type, first):
+        return GROVE_PINS[message_type - first]
+
+    def _get_grove_state(self, message_type, out, reply):
+        pin = self._pin_for(message_type, MSG.GET_GROVE_STATE_1_1)
+        mode = self.grove_mode[pin]
+        if mode in GROVE_DIGITAL_INPUT_MODES:
+            self._reply(reply, ">BB", GROVE_STATE.VALID_DATA, self.grove_digital[pin])
+        elif mode == gopigo3.GoPiGo3.GROVE_OUTPUT_DIGITAL:
+            self._reply(reply, ">BB", GROVE_STATE.VALID_DATA, self.grove_output[pin])
+        else:
+            self._reply(reply, ">BB", GROVE_STATE.NOT_CONFIGURED, 0)
+
+    def _get_grove_voltage(self, message_type, out, reply):
+        pin = self._pin_for(message_type, MSG.GET_GROVE_VOLTAGE_1_1)
+        if self.grove_mode[pin] in GROVE_ANALOG_MODES:
+            millivolts = int(round(self.grove_analog[pin] * self.grove_reference_voltage * 1000 / 4095.0))
+            self._reply(reply, ">BH", GROVE_STATE.VALID_DATA, millivolts)
+        else:
+            self._reply(reply, ">BH", GROVE_STATE.NOT_CONFIGURED, 0)
+
+    def _get_grove_analog(self, message_type, out, reply):
+        pin = self._pin_for(message_type, MSG.GET_GROVE_ANALOG_1_1)
+        if self.grove_mode[pin] in GROVE_ANALOG_MODES:
+            self._reply(reply, ">BH", GROVE_STATE.VALID_DATA, self.grove_analog[pin])
+        else:
+            self._reply(reply, ">BH", GROVE_STATE.NOT_CONFIGURED, 0)
+
+    def _get_grove_value(self, message_type, out, reply):
+        p = 0 if message_type == MSG.GET_GROVE_VALUE_1 else 1
+        grove_type = self.grove_type[p]
+        value = self.grove_value[p]
+        if grove_type == GROVE_TYPE.US:
+            if value is None:
+                value = 1   # no object detected within range
+            self._reply(reply, ">BBH", grove_type, GROVE_STATE.VALID_DATA, max(0, min(0xFFFF, int(value))))
+        elif grove_type == GROVE_TYPE.IR_DI_REMOTE:
+            self._reply(reply, ">BBB", grove_type, GROVE_STATE.VALID_DATA, int(value) & 0xFF)
+        elif grove_type == GROVE_TYPE.IR_EV3_REMOTE:
+            codes = list(value) if isinstance(value, (list, tuple)) else [0, 0, 0, 0]
+            self._reply(reply, ">BB4B", grove_type, GROVE_STATE.VALID_DATA, *[(c & 0xFF) for c in (codes + [0, 0, 0, 0])[:4]])
+        elif grove_type == GROVE_TYPE.I2C:
+            transaction = self._i2c[p]
+            if transaction is None:
+                self._reply(reply, ">BB", grove_type, GROVE_STATE.NO_DATA)
+            elif self.now() < transaction[0]:
+                self._reply(reply, ">BB", grove_type, GROVE_STATE.CONFIGURING)
+            else:
+                reply[3] = 0xA5
+                reply[4] = grove_type
+                reply[5] = transaction[1]
+                self._put(reply, 6, transaction[2])
+        else:
+            self._reply(reply, ">B", int(value or 0) & 0xFF)
+
+    def _start_grove_i2c(self, message_type, out, reply):
+        p = 0 if message_type == MSG.START_GROVE_I2C_1 else 1
+        if len(reply) > 4:
+            reply[3] = 0xA5
+        transaction = self._i2c[p]
+        if self.grove_type[p] != GROVE_TYPE.I2C or len(out) < 5 or \
+           (transaction is not None and self.now() < transaction[0]):
+            if len(reply) > 4:
+                reply[4] = 1   # not ready to start an I2C transaction
+            return
+
+        address = out[2] >> 1
+        in_bytes = out[3]
+        out_bytes = out[5:5 + out[4]]
+        duration = 0
+        if len(out_bytes):
+            duration += 1 + len(out_bytes)
+        if in_bytes:
+            duration += 1 + in_bytes
+        done = self.now() + duration * I2C_BYTE_TIME
+
+        device = self.i2c_devices[p].get(address)
+        if device is None:
+            self._i2c[p] = (done, GROVE_STATE.I2C_ERROR, [])
+        else:
+            transfer = getattr(device, "i2c_transfer", device)
+            try:
+                data = list(transfer(list(out_bytes), in_bytes) or [])
+                self._i2c[p] = (done, GROVE_STATE.VALID_DATA, (data + [0] * in_bytes)[:in_bytes])
+            except IOError:
+                self._i2c[p] = (done, GROVE_STATE.I2C_ERROR, [])
+        if len(reply) > 4:
+            reply[4] = 0
@@ -0,0 +1,206 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# Background telemetry poller for the GoPiGo3
+
+from __future__ import print_function
+from __future__ import division
+
+import collections
+import threading
+import time
+
+from gopigo3_scheduler import PeriodicTask, run_periodic
+
+
+TelemetrySnapshot = collections.namedtuple("TelemetrySnapshot", [
+    "timestamp",        # time.monotonic() at the end of the poll cycle
+    "sequence",         # increments by one for every published snapshot
+    "motor_status_left",    # get_motor_status(MOTOR_LEFT) as a tuple: flags, power, encoder, dps
+    "motor_status_right",   # get_motor_status(MOTOR_RIGHT) as a tuple: flags, power, encoder, dps
+    "encoder_left",     # left encoder position in degrees
+    "encoder_right",    # right encoder position in degrees
+    "voltage_battery",  # battery voltage in volts
+    "voltage_5v",       # 5v circuit voltage in volts
+])
+
+
+class GoPiGo3Telemetry(object):
+    """
+    Poll the GoPiGo3 motor status, encoders and voltages on one background thread.
+
+    Every poll cycle publishes a new immutable :py:class:`TelemetrySnapshot`. Readers fetch the
+    latest snapshot with :py:meth:`get_snapshot` without doing any SPI transactions, so any
+    number of threads can share one stream of bus traffic.
+
+    .. code-block:: python
+
+        gpg = gopigo3.GoPiGo3()
+        telemetry = GoPiGo3Telemetry(gpg, rate = 50)
+        telemetry.start()
+        snapshot = telemetry.get_snapshot()
+        print(snapshot.encoder_left, snapshot.voltage_battery)
+        telemetry.stop()
+
+    """
+
+    def __init__(self, gpg, rate = 50, voltage_divider = 10):
+        """
+        Keyword arguments:
+        gpg -- the GoPiGo3 object to poll
+        rate -- the number of poll cycles per second
+        voltage_divider -- read the voltages only every Nth cycle (they change slowly). 1 reads them every cycle.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be a positive number")
+
+        self.gpg = gpg
+        self.period = 1.0 / rate
+        self.voltage_divider = max(1, int(voltage_divider))
+
+        self.cycles = 0
+        self.errors = 0
+        self.last_error = None
+
+        self._task = PeriodicTask(self._poll, self.period, "GoPiGo3Telemetry")
+        self._snapshot = None
+        self._updated = threading.Condition(threading.Lock())
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the poller thread. Blocks until the first snapshot is available (or the first poll failed).
+        """
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target = self._run, name = "GoPiGo3Telemetry")
+        self._thread.daemon = True
+        # started with the condition held, so that the first poll can't notify before we wait
+        with self._updated:
+            self._thread.start()
+            if self._snapshot is None:
+                self._updated.wait(max(1.0, self.period * 2))
+
+    def stop(self, timeout = 1.0):
+        """
+        Stop the poller thread. The last snapshot stays available.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def overruns(self):
+        """
+        The number of poll cycles that ended after the next one was due
+        """
+        return self._task.overruns
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_snapshot(self):
+        """
+        Get the latest telemetry snapshot, or None if nothing has been polled yet.
+
+        The snapshot is published by replacing a single reference, so this never blocks and never touches SPI.
+        """
+        return self._snapshot
+
+    def wait_for_snapshot(self, sequence = None, timeout = None):
+        """
+        Wait for a snapshot newer than ``sequence``.
+
+        Keyword arguments:
+        sequence -- the sequence number of the snapshot already seen, or None to wait for any snapshot
+        timeout -- the maximum time to wait in seconds, or None to wait forever
+
+        Returns the newest snapshot, or None if the timeout expired before anything was published.
+        """
+        with self._updated:
+            snapshot = self._snapshot
+            if snapshot is not None and (sequence is None or snapshot.sequence > sequence):
+                return snapshot
+            self._updated.wait(timeout)
+            snapshot = self._snapshot
+            if snapshot is not None and (sequence is None or snapshot.sequence > sequence):
+                return snapshot
+            return None
+
+    def get_age(self):
+        """
+        Get the age of the latest snapshot in seconds, or None if nothing has been polled yet.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return time.monotonic() - snapshot.timestamp
+
+    def poll_once(self):
+        """
+        Do one poll cycle on the calling thread and publish the result.
+
+        Returns the new snapshot.
+        """
+        gpg = self.gpg
+        previous = self._snapshot
+
+        # both motors under one hold of the lock, so that no other transaction runs between them
+        with gpg.spi_lock:
+            status_left = tuple(gpg.get_motor_status(gpg.MOTOR_LEFT))
+            status_right = tuple(gpg.get_motor_status(gpg.MOTOR_RIGHT))
+
+        if previous is None or (self.cycles % self.voltage_divider) == 0:
+            voltage_battery = gpg.get_voltage_battery()
+            voltage_5v = gpg.get_voltage_5v()
+        else:
+            voltage_battery = previous.voltage_battery
+            voltage_5v = previous.voltage_5v
+
+        snapshot = TelemetrySnapshot(
+            timestamp = time.monotonic(),
+            sequence = 0 if previous is None else previous.sequence + 1,
+            motor_status_left = status_left,
+            motor_status_right = status_right,
+            encoder_left = status_left[2],
+            encoder_right = status_right[2],
+            voltage_battery = voltage_battery,
+            voltage_5v = voltage_5v,
+        )
+        self.cycles += 1
+
+        with self._updated:
+            self._snapshot = snapshot
+            self._updated.notify_all()
+        return snapshot
+
+    def _poll(self):
+        try:
+            self.poll_once()
+        except Exception as e:
+            # IOError from the SPI bus, or anything else: keep the previous snapshot (its timestamp shows its
+            # age) and try again next cycle instead of ending the thread
+            self.errors += 1
+            self.last_error = e
+            # wake up start() waiting for the first snapshot
+            with self._updated:
+                self._updated.notify_all()
+
+    def _run(self):
+        run_periodic(self._task, self._stop_event)
+
+        # wake up anyone still waiting for a snapshot
+        with self._updated:
+            self._updated.notify_all()
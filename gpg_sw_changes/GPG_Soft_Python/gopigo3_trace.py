@@ -0,0 +1,371 @@
+# https://github.com/tuftsceeo/GoPiGo3_PiOS_Bookworm
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/DexterInd/GoPiGo3/blob/master/LICENSE.md
+#
+# SPI bus tracing and replay for the GoPiGo3
+
+from __future__ import print_function
+from __future__ import division
+
+import atexit
+import collections
+import mmap
+import os
+import struct
+import threading
+import time
+
+import gopigo3
+
+
+# File layout: a header, then records one after the other. All numbers are little endian.
+#   header: magic, format version, reserved, length of the data written (header included)
+#   record: start time (time.monotonic_ns), duration in ns, transfer length n, flags, then n bytes sent and n bytes received
+TRACE_MAGIC = b"GPG3SPI\0"
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct("<8sHHIQ")
+TRACE_RECORD = struct.Struct("<QIHH")
+TRACE_GROW_SIZE = 1 << 20
+
+FLAG_ERROR = 1      # the transfer raised an exception; the reply bytes are zeros
+
+
+SPIRecord = collections.namedtuple("SPIRecord", [
+    "timestamp_ns",     # time.monotonic_ns() when the transfer started
+    "duration_ns",      # how long the transfer took
+    "tx",               # the bytes sent
+    "rx",               # the bytes received
+    "flags",            # FLAG_ERROR if the transfer failed
+])
+
+
+class SPITraceWriter(object):
+    """
+    Append-only binary log of SPI transfers in a memory-mapped file.
+
+    The file grows in steps of ``TRACE_GROW_SIZE`` and the header records how much of it is valid, so a log from a
+    program that crashed can still be read up to the last complete record.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._size = TRACE_GROW_SIZE
+        os.ftruncate(self._fd, self._size)
+        self._map = mmap.mmap(self._fd, self._size)
+        self._offset = TRACE_HEADER.size
+        self._write_header()
+
+    def _write_header(self):
+        TRACE_HEADER.pack_into(self._map, 0, TRACE_MAGIC, TRACE_VERSION, 0, 0, self._offset)
+
+    def write(self, timestamp_ns, duration_ns, tx, rx, flags = 0):
+        """
+        Append one transfer. ``tx`` and ``rx`` are sequences of bytes of the same length.
+        """
+        length = len(tx)
+        size = TRACE_RECORD.size + 2 * length
+        with self._lock:
+            if self._map is None:
+                return
+            offset = self._offset
+            if offset + size > self._size:
+                self._size += max(TRACE_GROW_SIZE, size)
+                os.ftruncate(self._fd, self._size)
+                self._map.resize(self._size)
+            TRACE_RECORD.pack_into(self._map, offset, timestamp_ns, min(duration_ns, 0xFFFFFFFF), length, flags)
+            offset += TRACE_RECORD.size
+            self._map[offset:offset + length] = bytes(bytearray(tx))
+            offset += length
+            self._map[offset:offset + length] = bytes(bytearray(rx))
+            self._offset = offset + length
+            # commit the record
+            struct.pack_into("<Q", self._map, TRACE_HEADER.size - 8, self._offset)
+            self.records += 1
+
+    def close(self):
+        """
+        Flush the log and trim the file to the data written
+        """
+        with self._lock:
+            if self._map is None:
+                return
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            os.ftruncate(self._fd, self._offset)
+            os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_trace(path):
+    """
+    Read an SPI trace file
+
+    Returns a list of SPIRecord.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, _, _, end = TRACE_HEADER.unpack_from(data, 0)
+    if magic != TRACE_MAGIC:
+        raise IOError("%s is not a GoPiGo3 SPI trace" % path)
+    if version != TRACE_VERSION:
+        raise IOError("Unsupported SPI trace version %d" % version)
+    end = min(end, len(data))
+    records = []
+    offset = TRACE_HEADER.size
+    while offset + TRACE_RECORD.size <= end:
+        timestamp_ns, duration_ns, length, flags = TRACE_RECORD.unpack_from(data, offset)
+        offset += TRACE_RECORD.size
+        if offset + 2 * length > end:
+            break
+        tx = data[offset:offset + length]
+        rx = data[offset + length:offset + 2 * length]
+        offset += 2 * length
+        records.append(SPIRecord(timestamp_ns, duration_ns, tx, rx, flags))
+    return records
+
+
+def message_type_names():
+    """
+    Get a dict of SPI message type number to name
+    """
+    return dict((value, name) for name, value in vars(gopigo3.GoPiGo3.SPI_MESSAGE_TYPE).items())
+
+
+def latency_report(records):
+    """
+    Get the transfer latency percentiles per SPI message type from a trace
+
+    Keyword arguments:
+    records -- a list of SPIRecord, or the path of a trace file
+
+    Returns a dict of message type name to LatencyHistogram snapshot (seconds), plus an ``errors`` count for each.
+    """
+    if not isinstance(records, (list, tuple)):
+        records = read_trace(records)
+    names = message_type_names()
+    histograms = {}
+    errors = {}
+    for record in records:
+        message_type = record.tx[1] if len(record.tx) > 1 else None
+        name = names.get(message_type, str(message_type))
+        if name not in histograms:
+            histograms[name] = gopigo3.LatencyHistogram()
+            errors[name] = 0
+        histograms[name].record(record.duration_ns / 1e9)
+        if record.flags & FLAG_ERROR:
+            errors[name] += 1
+    report = {}
+    for name, histogram in histograms.items():
+        snapshot = histogram.snapshot()
+        del snapshot["buckets"]
+        snapshot["errors"] = errors[name]
+        report[name] = snapshot
+    return report
+
+
+class TracingBackend(gopigo3.SPIBackend):
+    """
+    SPI backend that records every transfer of another backend into an SPITraceWriter
+    """
+
+    def __init__(self, backend, writer):
+        self.backend = backend
+        self.writer = writer
+
+    def get_transaction_lock(self):
+        return self.backend.get_transaction_lock()
+
+    def get_speed_hz(self):
+        return self.backend.get_speed_hz()
+
+    def set_speed_hz(self, speed_hz):
+        self.backend.set_speed_hz(speed_hz)
+
+    def get_cache_key(self):
+        return self.backend.get_cache_key()
+
+    def xfer2(self, data_out):
+        start = time.monotonic_ns()
+        try:
+            reply = self.backend.xfer2(data_out)
+        except Exception:
+            self.writer.write(start, time.monotonic_ns() - start, data_out, bytes(len(data_out)), FLAG_ERROR)
+            raise
+        self.writer.write(start, time.monotonic_ns() - start, data_out, reply)
+        return reply
+
+    def xfer_into(self, message):
+        start = time.monotonic_ns()
+        try:
+            self.backend.xfer_into(message)
+        except Exception:
+            self.writer.write(start, time.monotonic_ns() - start, message.tx, bytes(len(message.tx)), FLAG_ERROR)
+            raise
+        self.writer.write(start, time.monotonic_ns() - start, message.tx, message.rx)
+
+    def xfer_many(self, messages):
+        start = time.monotonic_ns()
+        try:
+            offsets = self.backend.xfer_many(messages)
+        except Exception:
+            duration = time.monotonic_ns() - start
+            for message in messages:
+                self.writer.write(start, duration // len(messages), message.tx, bytes(len(message.tx)), FLAG_ERROR)
+            raise
+        duration = time.monotonic_ns() - start
+        for message, offset in zip(messages, offsets):
+            self.writer.write(start + int(offset * 1e9), duration // len(messages), message.tx, message.rx)
+        return offsets
+
+    def close(self):
+        self.backend.close()
+
+
+class SPITracer(object):
+    """
+    Opt-in tracer of the SPI transfers of GoPiGo3 objects.
+
+    .. code-block:: python
+
+        with SPITracer("/tmp/run.gpg3trace") as tracer:
+            tracer.attach(gpg)
+            run_control_loop(gpg)
+        print(latency_report("/tmp/run.gpg3trace"))
+
+    Every GoPiGo3 process can also be traced without code changes by setting the environment variable
+    ``GOPIGO3_SPI_TRACE`` to the path of the trace file. Each process appends its pid to the path
+    (``/tmp/run.gpg3trace.1234``), so processes started with the same environment don't overwrite each other.
+    """
+
+    def __init__(self, path):
+        self.writer = SPITraceWriter(path)
+        self._attached = []
+
+    def wrap(self, backend):
+        """
+        Get a TracingBackend for ``backend`` that records into this tracer
+        """
+        return TracingBackend(backend, self.writer)
+
+    def attach(self, gpg):
+        """
+        Start recording the transfers of a GoPiGo3 object
+        """
+        if not isinstance(gpg.spi_backend, TracingBackend):
+            self._attached.append((gpg, gpg.spi_backend))
+            gpg.spi_backend = self.wrap(gpg.spi_backend)
+
+    def detach(self, gpg = None):
+        """
+        Stop recording a GoPiGo3 object, or every attached one
+        """
+        for item in list(self._attached):
+            if gpg is None or item[0] is gpg:
+                item[0].spi_backend = item[1]
+                self._attached.remove(item)
+
+    def close(self):
+        self.detach()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def trace_backend(backend, path):
+    """
+    Get a TracingBackend that records the transfers of ``backend`` into a new trace file at ``path``.
+    The trace file is closed when the program exits.
+    """
+    writer = SPITraceWriter(path)
+    atexit.register(writer.close)
+    return TracingBackend(backend, writer)
+
+
+class ReplayMismatchError(Exception):
+    """Exception raised if the driver sends something else than what the trace recorded"""
+
+
+class ReplayBackend(gopigo3.SPIBackend):
+    """
+    SPI backend that answers with the replies recorded in a trace, to reproduce a run offline.
+
+    With ``match = "exact"`` (the default), transfers must come in the recorded order with the recorded bytes,
+    and a divergence raises ReplayMismatchError. With ``match = "type"``, each transfer gets the next recorded
+    reply for the same message type and length, so a control loop can diverge a little (different setpoints,
+    a different number of polls) and still get realistic replies. With ``realtime = True`` every transfer takes
+    as long as the recorded one did.
+    """
+
+    def __init__(self, records, match = "exact", realtime = False):
+        """
+        Keyword arguments:
+        records -- a list of SPIRecord, or the path of a trace file
+        match -- "exact" or "type"
+        realtime -- sleep for the recorded duration of each transfer
+        """
+        if not isinstance(records, (list, tuple)):
+            records = read_trace(records)
+        if match not in ("exact", "type"):
+            raise ValueError("match must be 'exact' or 'type'")
+        self.records = records
+        self.match = match
+        self.realtime = realtime
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._position = 0
+        self._queues = collections.defaultdict(collections.deque)
+        if match == "type":
+            for record in records:
+                self._queues[self._key(record.tx)].append(record)
+
+    @staticmethod
+    def _key(data):
+        return (data[1] if len(data) > 1 else None, len(data))
+
+    def remaining(self):
+        if self.match == "exact":
+            return len(self.records) - self._position
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _next(self, data_out):
+        data_out = bytes(bytearray(int(b) & 0xFF for b in data_out))
+        with self._lock:
+            if self.match == "exact":
+                if self._position >= len(self.records):
+                    raise ReplayMismatchError("SPI replay: the trace has no more transfers")
+                record = self.records[self._position]
+                if record.tx != data_out:
+                    raise ReplayMismatchError("SPI replay: transfer %d was %s in the trace but %s now" % (
+                        self._position, list(bytearray(record.tx)), list(bytearray(data_out))))
+                self._position += 1
+            else:
+                queue = self._queues.get(self._key(data_out))
+                if not queue:
+                    raise ReplayMismatchError("SPI replay: no more recorded transfers like %s" % list(bytearray(data_out)))
+                record = queue.popleft()
+            self.replayed += 1
+        if self.realtime:
+            time.sleep(record.duration_ns / 1e9)
+        if record.flags & FLAG_ERROR:
+            raise IOError("No SPI response (replayed)")
+        return record
+
+    def xfer2(self, data_out):
+        return list(bytearray(self._next(data_out).rx))
+
+    def xfer_into(self, message):
+        message.rx[:] = self._next(message.tx).rx
@@ -43,6 +43,6 @@ setup(
     keywords = ['robot', 'gopigo', 'gopigo3', 'modular robotics', 'learning', 'education'],
 
     packages=find_packages(),
-    py_modules = ['gopigo3','easygopigo3', 'easysensors'],
+    py_modules = ['gopigo3','easygopigo3', 'easysensors', 'gopigo3_telemetry', 'gopigo3_sim', 'gopigo3_odometry', 'gopigo3_scheduler', 'gopigo3_grove_i2c', 'gopigo3_grove_sampler', 'gopigo3_asyncio', 'gopigo3_trace', 'gopigo3_motion', 'gopigo3_path', 'gopigo3_battery', 'gopigo3_remote', 'gopigo3_broker'],
     install_requires = ['spidev']
 )
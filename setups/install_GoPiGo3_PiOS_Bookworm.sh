@@ -59,6 +59,19 @@ sudo mv setup.py setup.py.orig
 sudo cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/setup.py .
 sudo mv gopigo3.py gopigo3.py.orig
 cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3.py.bookwormPi5 gopigo3.py
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_telemetry.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_sim.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_odometry.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_scheduler.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_grove_i2c.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_grove_sampler.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_asyncio.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_trace.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_motion.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_path.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_battery.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_remote.py .
+cp ~/GoPiGo3_PiOS_Bookworm/gpg_sw_changes/GPG_Soft_Python/gopigo3_broker.py .
 sudo pip3 install -e . --break-system-packages
 
 